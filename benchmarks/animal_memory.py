@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+"""
+Memory benchmark for the animals on an Island.
+
+Places 10k, 100k and 1M animals on a reference island (square of Lowland surrounded by
+Water, four herbivores for every carnivore) and reports the bytes allocated per animal and
+the total resident memory (RSS) of the process. Every size runs in a fresh process so the
+RSS numbers are not influenced by earlier runs.
+
+Usage:
+
+    python benchmarks/animal_memory.py [--backend object|columnar] [--max-bytes N]
+
+With --max-bytes the script exits with status 1 if any size uses more than N bytes per
+animal, so it can be used to catch regressions in the per-animal footprint.
+"""
+
+__author__ = "Anja Stene, Student NMBU", "Ghazal Azadi, Student NMBU"
+__email__ = "anja.stene@nmbu.no", "ghazal.azadi@nmbu.no"
+
+import argparse
+import os
+import subprocess
+import sys
+import tracemalloc
+
+from maps import reference_map
+
+SIZES = (10_000, 100_000, 1_000_000)
+SIDE = 50  # land cells along each side of the reference island
+
+
+def rss_bytes():
+    """
+    Current resident memory of the process, read from /proc (Linux only).
+
+    Returns
+    -------
+    rss: int
+        bytes, or 0 if not available
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+def measure(num_animals, backend):
+    """
+    Places num_animals on the reference island and measures the memory used.
+
+    Parameters
+    ----------
+    num_animals: int
+    backend: str
+
+    Returns
+    -------
+    bytes_per_animal, rss: float, int
+    """
+    from biosim.island import Island
+
+    island = Island(reference_map(SIDE), backend)
+    num_cells = SIDE * SIDE
+    per_cell = num_animals // num_cells
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for i in range(num_cells):
+        pop = [{'species': 'Herbivore' if k % 5 else 'Carnivore', 'age': 5, 'weight': 20.}
+               for k in range(per_cell)]
+        island.place_animals([{'loc': (i // SIDE + 2, i % SIDE + 2), 'pop': pop}])
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    placed = per_cell * num_cells
+    return (after - before) / placed, rss_bytes()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--backend', default='object', choices=['object', 'columnar'])
+    parser.add_argument('--max-bytes', type=float, default=None)
+    parser.add_argument('--size', type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.size is not None:
+        per_animal, rss = measure(args.size, args.backend)
+        print(per_animal, rss)
+        return
+
+    print('backend: {}'.format(args.backend))
+    print('{:>10} {:>16} {:>12}'.format('animals', 'bytes/animal', 'RSS [MB]'))
+    failed = False
+    for size in SIZES:
+        result = subprocess.run([sys.executable, __file__, '--backend', args.backend,
+                                 '--size', str(size)],
+                                capture_output=True, text=True, check=True)
+        per_animal, rss = result.stdout.split()
+        per_animal, rss = float(per_animal), int(rss)
+        print('{:>10} {:>16.1f} {:>12.1f}'.format(size, per_animal, rss / 2**20))
+        if args.max_bytes is not None and per_animal > args.max_bytes:
+            failed = True
+
+    if failed:
+        print('per-animal footprint above {} bytes'.format(args.max_bytes))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    main()
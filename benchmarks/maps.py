@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+
+"""
+Islands shared by the benchmarks. The benchmark scripts are run from the benchmarks
+directory, so they import this module as maps.
+"""
+
+__author__ = "Anja Stene, Student NMBU", "Ghazal Azadi, Student NMBU"
+__email__ = "anja.stene@nmbu.no", "ghazal.azadi@nmbu.no"
+
+
+def reference_map(side):
+    """
+    Square Lowland island surrounded by Water.
+
+    Parameters
+    ----------
+    side: int
+        number of land cells along each side
+
+    Returns
+    -------
+    island_map: str
+    """
+    water = 'W' * (side + 2)
+    land = 'W' + 'L' * side + 'W'
+    return '\n'.join([water] + [land] * side + [water])
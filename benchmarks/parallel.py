@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark for the row-stripe parallel engine.
+
+Places herbivores and carnivores in every land cell of a square island and reports the
+time used per year by the serial Island.annual_cycle and by ParallelIsland with an
+increasing number of worker processes. The speedup is limited by the number of CPUs.
+
+Usage:
+
+    python benchmarks/parallel.py [--side N] [--years N] [--workers N [N ...]] [--backend B]
+"""
+
+__author__ = "Anja Stene, Student NMBU", "Ghazal Azadi, Student NMBU"
+__email__ = "anja.stene@nmbu.no", "ghazal.azadi@nmbu.no"
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+from maps import reference_map
+
+SEED = 12345
+
+
+def reference_population(side):
+    """
+    Herbivores and carnivores in every land cell.
+
+    Parameters
+    ----------
+    side: int
+
+    Returns
+    -------
+    ini_pop: list of dicts
+    """
+    pop = ([{'species': 'Herbivore', 'age': 5, 'weight': 20} for _ in range(20)] +
+           [{'species': 'Carnivore', 'age': 5, 'weight': 20} for _ in range(2)])
+    return [{'loc': (x, y), 'pop': pop}
+            for x in range(2, side + 2) for y in range(2, side + 2)]
+
+
+def time_per_year(island, years):
+    """
+    Runs the annual cycle and measures the time used.
+
+    Parameters
+    ----------
+    island: Island or ParallelIsland
+    years: int
+
+    Returns
+    -------
+    seconds, herbivores: float, int
+        mean time per year and the number of herbivores at the end
+    """
+    start = time.perf_counter()
+    for _ in range(years):
+        island.annual_cycle()
+    seconds = (time.perf_counter() - start) / years
+    return seconds, island.total_num_animals_per_species('Herbivore')
+
+
+def main():
+    from biosim.island import Island
+    from biosim.parallel import ParallelIsland
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--side', type=int, default=100)
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4, 8])
+    parser.add_argument('--backend', default='columnar', choices=['object', 'columnar'])
+    args = parser.parse_args()
+
+    island_map = reference_map(args.side)
+    ini_pop = reference_population(args.side)
+    print('{0}x{0} land cells, {1} CPUs, backend: {2}'.format(
+        args.side, multiprocessing.cpu_count(), args.backend))
+    print('{:>10} {:>14} {:>10} {:>12}'.format('workers', 's/year', 'speedup', 'herbivores'))
+
+    island = Island(island_map, args.backend, seed=SEED)
+    island.place_animals(ini_pop)
+    serial, herbivores = time_per_year(island, args.years)
+    print('{:>10} {:>14.3f} {:>10.2f} {:>12}'.format('serial', serial, 1, herbivores))
+
+    for num_workers in args.workers:
+        with ParallelIsland(island_map, SEED, num_workers, args.backend) as island:
+            island.place_animals(ini_pop)
+            seconds, herbivores = time_per_year(island, args.years)
+        print('{:>10} {:>14.3f} {:>10.2f} {:>12}'.format(num_workers, seconds,
+                                                         serial / seconds, herbivores))
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark for the predation in one cell.
+
+Places 1k carnivores and 10k herbivores in a Lowland cell and reports the time used by
+Cell.carn_eat for both backends. Every repetition starts from a fresh cell with the same
+seed, so the backends do the same hunt.
+
+Usage:
+
+    python benchmarks/predation.py [--carnivores N] [--herbivores N] [--repeat N]
+"""
+
+__author__ = "Anja Stene, Student NMBU", "Ghazal Azadi, Student NMBU"
+__email__ = "anja.stene@nmbu.no", "ghazal.azadi@nmbu.no"
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+SEED = 12345
+
+
+def populated_cell(backend, num_carnivores, num_herbivores):
+    """
+    Lowland cell with herbivores and carnivores of random age and weight.
+
+    Parameters
+    ----------
+    backend: str
+    num_carnivores: int
+    num_herbivores: int
+
+    Returns
+    -------
+    cell: Lowland
+    """
+    from biosim.cell import Lowland
+
+    np.random.seed(SEED)
+    pop = [{'species': 'Herbivore', 'age': int(age), 'weight': float(weight)}
+           for age, weight in zip(np.random.randint(0, 30, num_herbivores),
+                                  np.random.uniform(5, 50, num_herbivores))]
+    pop += [{'species': 'Carnivore', 'age': int(age), 'weight': float(weight)}
+            for age, weight in zip(np.random.randint(0, 30, num_carnivores),
+                                   np.random.uniform(5, 50, num_carnivores))]
+    cell = Lowland(backend)
+    cell.place_animals(pop)
+    return cell
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--carnivores', type=int, default=1_000)
+    parser.add_argument('--herbivores', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print('{} carnivores x {} herbivores'.format(args.carnivores, args.herbivores))
+    print('{:>10} {:>12} {:>12}'.format('backend', 'best [s]', 'eaten'))
+    for backend in ['object', 'columnar']:
+        timings = []
+        for _ in range(args.repeat):
+            cell = populated_cell(backend, args.carnivores, args.herbivores)
+            start = time.perf_counter()
+            cell.carn_eat()
+            timings.append(time.perf_counter() - start)
+        eaten = args.herbivores - cell.get_num_animals('Herbivore')
+        print('{:>10} {:>12.4f} {:>12}'.format(backend, min(timings), eaten))
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    main()
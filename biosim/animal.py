@@ -3,6 +3,7 @@
 __author__ = "Anja Stene, Student NMBU", "Ghazal Azadi, Student NMBU"
 __email__ = "anja.stene@nmbu.no", "ghazal.azadi@nmbu.no"
 
+from biosim import kernels
 import math
 import numpy as np
 
@@ -13,8 +14,23 @@ class Animal:
     Has two subclasses of different animal species, Carnivores and Herbivores.
     The most distinct difference between the two subclasses: the eating-method.
 
+    Fitness is cached on the animal and only recalculated after age, weight or the
+    species parameters have changed. The class attribute fitness_evaluations counts every
+    evaluation of the fitness formula, for all animals of all species.
+
+    Instances have no __dict__; the per-animal state is kept in the slots listed below,
+    which keeps the memory footprint small when there are many animals.
+
+    The batch methods for all animals of a species in a cell use the compiled kernels of the
+    kernels module when they are switched on with kernels.use_jit.
+
     """
+    __slots__ = ('_age', '_weight', '_fitness', '_fitness_generation',
+                 'has_migrated_this_year')
+
     params = {}
+    fitness_evaluations = 0
+    _params_generation = 0
 
     def __init__(self, age=None, weight=None):
         """
@@ -23,7 +39,7 @@ class Animal:
         initial value for age would be 0 and
         initial value for weight is extracted from the initial_weight method.
         Specifying invalid age or weight values will raise a a value error.
-        Initial fitness is set to zero.
+        Fitness is not calculated before it is needed.
 
         Parameters
         ----------
@@ -31,6 +47,9 @@ class Animal:
         weight : float
 
         """
+        self._fitness = None
+        self._fitness_generation = Animal._params_generation
+
         if age is None:
             self.age = 0
         else:
@@ -45,6 +64,32 @@ class Animal:
 
         self.has_migrated_this_year = False
 
+    @property
+    def age(self):
+        """
+        Age of the animal. Setting a new value invalidates the cached fitness.
+        """
+        return self._age
+
+    @age.setter
+    def age(self, value):
+        if self._fitness is not None and value != self._age:
+            self._fitness = None
+        self._age = value
+
+    @property
+    def weight(self):
+        """
+        Weight of the animal. Setting a new value invalidates the cached fitness.
+        """
+        return self._weight
+
+    @weight.setter
+    def weight(self, value):
+        if self._fitness is not None and value != self._weight:
+            self._fitness = None
+        self._weight = value
+
     @classmethod
     def set_given_parameters(cls, parameters):
         """
@@ -73,6 +118,9 @@ class Animal:
                 raise RuntimeError('Unknown parameter, ' + str(parameter) +
                                    ' can\'t be set')
 
+        # cached fitness of existing animals is out of date with the new parameters
+        Animal._params_generation += 1
+
     def grow_older(self):
         """
         Animal object grows one year older:
@@ -85,17 +133,23 @@ class Animal:
         self.has_migrated_this_year = False
 
     @classmethod
-    def initial_weight(cls):
+    def initial_weight(cls, stream=None):
         """
         initialize the weights class attribute based on the normal distribution
 
+        Parameters
+        ----------
+        stream: RandomStream, optional
+            source of the random number, np.random.normal() is used if not given
+
         Returns
         -------
         Initial weight: float
             random number drawn from normal distribution
 
         """
-
+        if stream is not None:
+            return stream.normal(cls.params['w_birth'], cls.params['sigma_birth'])
         return np.random.normal(cls.params['w_birth'], cls.params['sigma_birth'])
 
     def update_weight(self, direction, amount=None):
@@ -149,10 +203,115 @@ class Animal:
         q2 = 1 / (1 + math.exp(-1 * (params['phi_weight'] * (weight - params['w_half']))))
         return q1*q2
 
+    @staticmethod
+    def _fitness_formula_array(age, weight, params):
+        """
+        Batch counterpart of _fitness_formula, evaluating the same formula for arrays of
+        ages and weights in one NumPy call.
+
+        Parameters
+        ----------
+        age :  np.ndarray
+        weight : np.ndarray
+        params : dict
+            class dictionary "params"
+
+        Returns
+        -------
+        q1*q2: np.ndarray
+            the fitness of every animal calculated from fitness formula
+
+        """
+        with np.errstate(over='ignore'):
+            q1 = 1 / (1 + np.exp(params['phi_age'] * (age - params['a_half'])))
+            q2 = 1 / (1 + np.exp(-params['phi_weight'] * (weight - params['w_half'])))
+        return q1*q2
+
+    @classmethod
+    def calculate_fitness_array(cls, age, weight):
+        """
+        Calculate the fitness for arrays of ages and weights of animals of this species.
+        As in calculate_fitness, fitness is zero where weight is zero.
+        Every element counts as one evaluation in fitness_evaluations.
+
+        Parameters
+        ----------
+        age :  np.ndarray
+        weight : np.ndarray
+
+        Returns
+        -------
+        fitness: np.ndarray
+
+        """
+        Animal.fitness_evaluations += len(age)
+        fitness = cls._fitness_formula_array(age, weight, cls.params)
+        return np.where(weight == 0, 0., fitness)
+
+    @classmethod
+    def update_fitness_of_animals(cls, animals):
+        """
+        Recalculates the cached fitness of all animals in the list that are out of date,
+        with one call to calculate_fitness_array.
+
+        Parameters
+        ----------
+        animals: list of objects
+            animals of this species
+
+        Returns
+        -------
+        fitness: np.ndarray
+            fitness of all animals in the list
+        """
+        generation = Animal._params_generation
+        stale = [animal for animal in animals
+                 if animal._fitness is None or animal._fitness_generation != generation]
+        if stale:
+            age = np.fromiter((animal._age for animal in stale), float, len(stale))
+            weight = np.fromiter((animal._weight for animal in stale), float, len(stale))
+            for animal, fitness in zip(stale,
+                                       cls.calculate_fitness_array(age, weight).tolist()):
+                animal._fitness = fitness
+                animal._fitness_generation = generation
+
+        return np.fromiter((animal._fitness for animal in animals), float, len(animals))
+
+    @staticmethod
+    def ages_of_animals(animals):
+        """
+        Ages of all animals in the list.
+
+        Parameters
+        ----------
+        animals: list of objects
+
+        Returns
+        -------
+        age: np.ndarray
+        """
+        return np.fromiter((animal._age for animal in animals), float, len(animals))
+
+    @staticmethod
+    def weights_of_animals(animals):
+        """
+        Weights of all animals in the list.
+
+        Parameters
+        ----------
+        animals: list of objects
+
+        Returns
+        -------
+        weight: np.ndarray
+        """
+        return np.fromiter((animal._weight for animal in animals), float, len(animals))
+
     def calculate_fitness(self):
         """
         Calculate the fitness of an Animal. I weight is zero, fitness is always zero.
         Else, fitness is calculated based on fitness formula.
+        The result is cached, and only recalculated if age, weight or parameters changed.
 
         Returns
         -------
@@ -160,13 +319,17 @@ class Animal:
             the fitness of the animal object
 
         """
-        if self.weight == 0:
-            return 0
-        else:
-            return self._fitness_formula(self.age, self.weight, self.params)
+        if self._fitness is None or self._fitness_generation != Animal._params_generation:
+            Animal.fitness_evaluations += 1
+            self._fitness_generation = Animal._params_generation
+            if self._weight == 0:
+                self._fitness = 0
+            else:
+                self._fitness = self._fitness_formula(self._age, self._weight, self.params)
+        return self._fitness
 
     @staticmethod
-    def from_prob_to_binary(prob):
+    def from_prob_to_binary(prob, stream=None):
         """
         Converts a probability to a binary value (True or False).
 
@@ -174,13 +337,18 @@ class Animal:
         ----------
         prob: float
             between 0 and 1
+        stream: RandomStream, optional
+            source of the random number, np.random.random() is used if not given
 
         Returns
         -------
         binary: boolean
             True or False based on random number and probability
         """
-        rand_nbr = np.random.random()
+        if stream is None:
+            rand_nbr = np.random.random()
+        else:
+            rand_nbr = stream.random()
         if rand_nbr < prob:
             return True
         else:
@@ -211,7 +379,8 @@ class Animal:
     def check_mother_minus_newborn_weight_conditions(self, newborn_weight):
         """
         Method to check conditions for mating is satisfied.
-        Checking that mothers weight can handle the weight reduction that comes from creating an offspring.
+        Checking that mothers weight can handle the weight reduction that comes from creating
+        an offspring.
         If the weight reduction is survivable for the mother,
         the weight is reduced by this amount and a True-value is returned.
 
@@ -232,7 +401,7 @@ class Animal:
         else:
             return False
 
-    def create_newborn(self, num_animals):
+    def create_newborn(self, num_animals, stream=None):
         """
         Creates a new animal based on several condition checks. If all checks passed:
         create a new animal of the same class as mother-animal, and return the newborn object.
@@ -240,6 +409,7 @@ class Animal:
         ----------
         num_animals: int
             Number of animals of same species in current cell
+        stream: RandomStream, optional
 
         Returns
         -------
@@ -249,19 +419,65 @@ class Animal:
         """
         if self.check_mating_weight_conditions(num_animals):
             prob = min(1, self.params['gamma'] * self.calculate_fitness() * (num_animals - 1))
-            creating = self.from_prob_to_binary(prob)
+            creating = self.from_prob_to_binary(prob, stream)
             if creating:
                 newborn = self.__class__()
                 if self.check_mother_minus_newborn_weight_conditions(newborn.weight):
                     return newborn
         return None
 
-    def is_dying(self):
+    @classmethod
+    def procreation_array(cls, weight, fitness, stream):
+        """
+        Batch counterpart of create_newborn for all animals of a species in a cell.
+        The mating weight conditions and birth probabilities are evaluated for the whole
+        population at once, the weights of all possible newborns are drawn with one call to
+        the normal distribution, and the xi check of the mothers weight is applied to all.
+        The caller reduces the weight of the mothers and adds the newborns.
+
+        Parameters
+        ----------
+        weight: np.ndarray
+            weights of all animals of the species in the cell
+        fitness: np.ndarray
+        stream: RandomStream
+
+        Returns
+        -------
+        mothers: np.ndarray of int
+            indices of the animals that give birth
+        newborn_weight: np.ndarray
+            weight of the newborn of each mother
+        """
+        num_animals = weight.shape[0]
+        if num_animals < 2:
+            return np.zeros(0, dtype=int), np.zeros(0)
+
+        p = cls.params
+        min_weight = p['zeta'] * (p['w_birth'] + p['sigma_birth'])
+        if kernels.jit_enabled():
+            mothers = np.flatnonzero(kernels.mating(weight, fitness,
+                                                    stream.random_array(num_animals),
+                                                    min_weight, p['gamma']))
+        else:
+            can_mate = weight > min_weight
+            prob = np.minimum(1, p['gamma'] * fitness * (num_animals - 1))
+            mothers = np.flatnonzero(can_mate & (stream.random_array(num_animals) < prob))
+
+        newborn_weight = stream.normal(p['w_birth'], p['sigma_birth'], mothers.shape[0])
+        affordable = weight[mothers] >= p['xi'] * newborn_weight
+        return mothers[affordable], newborn_weight[affordable]
+
+    def is_dying(self, stream=None):
         """
         Checks if animal object is dying based on probability calculated form formula:
         p = omega ( 1 - fitness)
         It weight is zero, the animal will die.
 
+        Parameters
+        ----------
+        stream: RandomStream, optional
+
         Returns
         -------
         binary: boolean
@@ -271,13 +487,41 @@ class Animal:
             return True
         prob = self.params['omega'] * (1 - self.calculate_fitness())
         # print('prob inside is_dying, fitness', prob, self.calculate_fitness())
-        return self.from_prob_to_binary(prob)
+        return self.from_prob_to_binary(prob, stream)
 
-    def check_if_migrates(self):
+    @classmethod
+    def is_dying_array(cls, weight, fitness, stream):
+        """
+        Batch counterpart of is_dying for all animals of a species in a cell.
+        Probabilities p = omega (1 - fitness) are calculated for the whole population at
+        once, and all random numbers are drawn with one call. Animals with zero weight die.
+
+        Parameters
+        ----------
+        weight: np.ndarray
+        fitness: np.ndarray
+        stream: RandomStream
+
+        Returns
+        -------
+        dying: np.ndarray of bool
+            True for every animal that must die
+        """
+        if kernels.jit_enabled():
+            return kernels.dying(weight, fitness, stream.random_array(weight.shape[0]),
+                                 cls.params['omega'])
+        prob = cls.params['omega'] * (1 - fitness)
+        return (weight <= 0) | (stream.random_array(weight.shape[0]) < prob)
+
+    def check_if_migrates(self, stream=None):
         """
         Checks if an animal will migrate. The animal can only migrate once a year.
         Probability of migration is calculated from formula p = mu * fitness
 
+        Parameters
+        ----------
+        stream: RandomStream, optional
+
         Returns
         -------
         binary: boolean
@@ -288,7 +532,7 @@ class Animal:
             return False
 
         prob = self.params['mu']*self.calculate_fitness()
-        will_migrate = self.from_prob_to_binary(prob)
+        will_migrate = self.from_prob_to_binary(prob, stream)
 
         if will_migrate:
             self.has_migrated_this_year = True
@@ -296,6 +540,36 @@ class Animal:
         else:
             return False
 
+    @classmethod
+    def migration_array(cls, fitness, has_migrated, stream):
+        """
+        Batch counterpart of check_if_migrates for all animals of a species in a cell.
+        Probabilities p = mu * fitness are compared to one block of random numbers, and the
+        direction of every migrating animal is drawn with one more call.
+        Animals that already migrated this year stay.
+
+        Parameters
+        ----------
+        fitness: np.ndarray
+        has_migrated: np.ndarray of bool
+        stream: RandomStream
+
+        Returns
+        -------
+        directions: np.ndarray of int
+            index 0-3 of the neighbouring cell to migrate to, -1 for animals that stay
+        """
+        num_animals = fitness.shape[0]
+        if kernels.jit_enabled():
+            migrates = kernels.migrating(fitness, has_migrated, stream.random_array(num_animals),
+                                         cls.params['mu'])
+        else:
+            migrates = ~has_migrated & (stream.random_array(num_animals) <
+                                        cls.params['mu'] * fitness)
+        directions = np.full(num_animals, -1)
+        directions[migrates] = stream.directions(np.count_nonzero(migrates))
+        return directions
+
     @staticmethod
     def raise_non_valid_attribute(attribute_name, attribute):
         """
@@ -335,6 +609,7 @@ class Herbivore(Animal):
     """
     Herbivore subclass of Animal Base Class
     """
+    __slots__ = ()
 
     params = {'w_birth': 8.,
               'sigma_birth': 1.5,
@@ -384,11 +659,51 @@ class Herbivore(Animal):
         self.weight += self.params['beta'] * amount
         return amount
 
+    @classmethod
+    def graze_array(cls, num_animals, available_fodder, stream):
+        """
+        Grazing of all herbivores in a cell in one pass over a random permutation.
+        The herbivores eat in the order of the permutation. Comparing the cumulative sum of
+        appetites with the available fodder, those before the cutoff eat their full appetite F,
+        the one at the cutoff eats what is left, and the rest get nothing.
+
+        Parameters
+        ----------
+        num_animals: int
+            number of herbivores in cell
+        available_fodder: float
+        stream: RandomStream
+
+        Returns
+        -------
+        order: np.ndarray of int
+            random order in which the herbivores eat
+        portions: np.ndarray
+            amount eaten by each herbivore, in the order given by order
+        available_fodder: float
+            fodder left in cell after grazing
+        """
+        order = stream.permutation(num_animals)
+        if kernels.jit_enabled():
+            portions, available_fodder = kernels.graze(num_animals, float(available_fodder),
+                                                       float(cls.params['F']))
+            return order, portions, available_fodder
+
+        appetite = np.full(num_animals, float(cls.params['F']))
+        total_appetite = np.cumsum(appetite)
+        eaten_before = total_appetite - appetite
+        portions = np.clip(available_fodder - eaten_before, 0, appetite)
+
+        if num_animals > 0:
+            available_fodder = max(available_fodder - total_appetite[-1], 0)
+        return order, portions, available_fodder
+
 
 class Carnivore(Animal):
     """
     Carnivore subclass of Animal Base Class
     """
+    __slots__ = ()
 
     params = {'w_birth': 6.,
               'sigma_birth': 1.0,
@@ -417,7 +732,8 @@ class Carnivore(Animal):
         """
         super().__init__(age, weight)
 
-    def check_carn_prey(self, herb_fitness, carn_fitness):
+    @classmethod
+    def check_carn_prey(cls, herb_fitness, carn_fitness, stream=None):
         """
         Check assessing if a carnivore can prey on a herbivore.
         Condition is based on both animals fitness.
@@ -429,6 +745,7 @@ class Carnivore(Animal):
         ----------
         herb_fitness: float
         carn_fitness: float
+        stream: RandomStream, optional
 
         Returns
         -------
@@ -439,14 +756,14 @@ class Carnivore(Animal):
         if carn_fitness <= herb_fitness:
             return False
 
-        elif (carn_fitness-herb_fitness) < self.params['DeltaPhiMax'] > 0:
-            prob = (carn_fitness-herb_fitness) / self.params['DeltaPhiMax']
-            return self.from_prob_to_binary(prob)
+        elif (carn_fitness-herb_fitness) < cls.params['DeltaPhiMax'] > 0:
+            prob = (carn_fitness-herb_fitness) / cls.params['DeltaPhiMax']
+            return cls.from_prob_to_binary(prob, stream)
 
         else:
             return True
 
-    def eat(self, herb_list):
+    def eat(self, herb_list, stream=None):
         """
         Eat method for Carnivores.
         Loops through a list of all available herbivores, checks if the carnivore preys on it.
@@ -458,6 +775,7 @@ class Carnivore(Animal):
         ----------
         herb_list: list
             list of all available herbivores in cell
+        stream: RandomStream, optional
 
         Returns
         -------
@@ -469,7 +787,8 @@ class Carnivore(Animal):
         remaining_appetite = self.params['F']
 
         for herbivore in herb_list:
-            if self.check_carn_prey(herbivore.calculate_fitness(), self.calculate_fitness()):
+            if self.check_carn_prey(herbivore.calculate_fitness(), self.calculate_fitness(),
+                                    stream):
                 eaten_herbs.append(herbivore)
 
                 if remaining_appetite - herbivore.weight >= 0:
@@ -485,3 +804,117 @@ class Carnivore(Animal):
                 return eaten_herbs
 
         return eaten_herbs
+
+    @staticmethod
+    def _next_alive(next_alive, position):
+        """
+        Finds the first prey at or after position that is not eaten yet.
+        next_alive points every eaten prey to the one after it, and the pointers are
+        shortened on the way (path compression), so eaten prey are skipped in amortized
+        constant time.
+
+        Parameters
+        ----------
+        next_alive: list of int
+        position: int
+
+        Returns
+        -------
+        position: int
+            position of the next prey not eaten, or the number of prey if there is none
+        """
+        alive = position
+        while next_alive[alive] != alive:
+            alive = next_alive[alive]
+        while next_alive[position] != alive:
+            next_alive[position], position = alive, next_alive[position]
+        return alive
+
+    @classmethod
+    def hunt_array(cls, age, weight, fitness, prey_weight, prey_fitness, stream):
+        """
+        Predation engine for all carnivores and herbivores in a cell.
+        Herbivores are sorted once from lowest to highest fitness, and carnivores hunt in the
+        order of highest to lowest fitness, each with the same conditions as eat and
+        check_carn_prey. Eaten herbivores are only flagged while the carnivores hunt, and are
+        skipped by the following carnivores without re-sorting the ones left.
+        A carnivore stops when its appetite is filled, or at the first herbivore that is at
+        least as fit as itself, since all herbivores after it are fitter still.
+
+        Parameters
+        ----------
+        age: np.ndarray
+            ages of the carnivores
+        weight: np.ndarray
+            weights of the carnivores
+        fitness: np.ndarray
+            fitness of the carnivores
+        prey_weight: np.ndarray
+        prey_fitness: np.ndarray
+        stream: RandomStream
+
+        Returns
+        -------
+        prey_order: np.ndarray of int
+            herbivore indices from lowest to highest fitness
+        hunter_order: np.ndarray of int
+            carnivore indices from highest to lowest fitness
+        eaten: np.ndarray of bool
+            True for every eaten herbivore
+        weight: np.ndarray
+            weights of the carnivores after eating
+        fitness: np.ndarray
+            fitness of the carnivores after eating
+        """
+        p = cls.params
+        delta_phi_max = p['DeltaPhiMax']
+        prey_order = np.argsort(prey_fitness, kind='stable')
+        hunter_order = np.argsort(-fitness, kind='stable')
+        weight = np.array(weight, dtype=float)
+        fitness = np.array(fitness, dtype=float)
+
+        if kernels.jit_enabled():
+            eaten_sorted = kernels.hunt(hunter_order, age, weight, fitness,
+                                        prey_fitness[prey_order], prey_weight[prey_order],
+                                        p, stream)
+            # the fitness of a carnivore is calculated again after every herbivore eaten
+            Animal.fitness_evaluations += int(np.count_nonzero(eaten_sorted))
+            eaten = np.zeros(eaten_sorted.shape[0], dtype=bool)
+            eaten[prey_order[eaten_sorted]] = True
+            return prey_order, hunter_order, eaten, weight, fitness
+
+        sorted_fitness = prey_fitness[prey_order].tolist()
+        sorted_weight = prey_weight[prey_order].tolist()
+        num_prey = len(sorted_fitness)
+        next_alive = list(range(num_prey + 1))
+        eaten_sorted = np.zeros(num_prey, dtype=bool)
+
+        for hunter in hunter_order.tolist():
+            carn_fitness = fitness[hunter]
+            remaining_appetite = p['F']
+            position = cls._next_alive(next_alive, 0)
+
+            while position < num_prey:
+                fitness_difference = carn_fitness - sorted_fitness[position]
+                if fitness_difference <= 0:
+                    break
+                # same condition as check_carn_prey
+                if (fitness_difference >= delta_phi_max or
+                        stream.random() < fitness_difference / delta_phi_max):
+                    eaten_sorted[position] = True
+                    next_alive[position] = position + 1
+
+                    weight_to_eat = min(sorted_weight[position], remaining_appetite)
+                    remaining_appetite -= weight_to_eat
+                    weight[hunter] += p['beta'] * weight_to_eat
+                    carn_fitness = cls.calculate_fitness_array(age[hunter:hunter + 1],
+                                                               weight[hunter:hunter + 1])[0]
+                    fitness[hunter] = carn_fitness
+
+                if remaining_appetite == 0:
+                    break
+                position = cls._next_alive(next_alive, position + 1)
+
+        eaten = np.zeros(num_prey, dtype=bool)
+        eaten[prey_order[eaten_sorted]] = True
+        return prey_order, hunter_order, eaten, weight, fitness
@@ -3,7 +3,10 @@
 __author__ = "Anja Stene, Student NMBU", "Ghazal Azadi, Student NMBU"
 __email__ = "anja.stene@nmbu.no", "ghazal.azadi@nmbu.no"
 
-from biosim.animal import Herbivore, Carnivore
+from biosim.animal import Animal, Herbivore, Carnivore
+from biosim.population import Population, partition
+from biosim.randomstream import phase_streams
+from itertools import compress
 import numpy as np
 
 
@@ -12,21 +15,54 @@ class Cell:
     Cell class where the object works as a building block for Island.
     It has four subclasses: Water, Highland, Lowland, Desert inherited from the base class.
     Baseclass contains functionality that is common for all cells types.
+
+    The animals in the cell are stored by one of two backends:
+    'object' keeps lists of Herbivore and Carnivore objects,
+    'columnar' keeps one Population (arrays of age, weight, fitness and has_migrated)
+    per species.
+
+    Random decisions are drawn from one RandomStream per phase (see randomstream),
+    prepared with a block sized to the population of the cell at the start of the phase.
     """
-    def __init__(self):
+    backends = ('object', 'columnar')
+    habitable = True
+
+    def __init__(self, backend='object', random_streams=None):
         """
         Constructor for the class, all attributes start off as empty lists.
-        """
-        self.herbivores_list = []
-        self.carnivores_list = []
-        self.newborn_herb_list = []
-        self.newborn_carn_list = []
+        Raises value error if the backend is not known.
+
+        Parameters
+        ----------
+        backend: str
+            'object' or 'columnar'
+        random_streams: dict, optional
+            RandomStream for each phase, new streams are created if not given
+        """
+        if backend not in self.backends:
+            raise ValueError('Unknown backend, ' + str(backend) +
+                             ', must be one of ' + str(self.backends))
+        self.backend = backend
+        self._columnar = backend == 'columnar'
+
+        if self._columnar:
+            self.herbivores = Population(Herbivore)
+            self.carnivores = Population(Carnivore)
+        else:
+            self.herbivores_list = []
+            self.carnivores_list = []
+            self.newborn_herb_list = []
+            self.newborn_carn_list = []
+        if random_streams is None:
+            random_streams = phase_streams()
+        self.random_streams = random_streams
         self.migratable_cells = []
         self.available_fodder = 0
 
     def place_animals(self, listof):
         """
         Places animal objects in cell. Information of animal type is provided by the input.
+        Missing weights are drawn from the placement stream of the cell.
         Raises value error if carnivore species is not familias
 
         Parameters
@@ -36,43 +72,75 @@ class Cell:
             {'species': 'Carnivore', 'age': 5, 'weight': 20}
 
         """
+        stream = self.random_streams['placement']
+        herbivores, carnivores = self._animals_by_species(listof)
+        if self._columnar:
+            self.herbivores.place_animals(herbivores, stream)
+            self.carnivores.place_animals(carnivores, stream)
+            return
+
+        for species, animals, placed in [(Herbivore, self.herbivores_list, herbivores),
+                                         (Carnivore, self.carnivores_list, carnivores)]:
+            for age, weight in placed:
+                if weight is None:
+                    weight = species.initial_weight(stream)
+                animals.append(species(age=age, weight=weight))
+
+    @staticmethod
+    def _animals_by_species(listof):
+        """
+        Sorts the animals to place by species, so missing weights are drawn in the same
+        order by both backends.
+        Raises value error if carnivore species is not familias
+
+        Parameters
+        ----------
+        listof: list of dictionaries
+
+        Returns
+        -------
+        herbivores, carnivores: lists of tuples
+            (age, weight) for every animal of the species
+        """
+        herbivores = []
+        carnivores = []
         for dct in listof:
             get = dct.get("species")
             if get == 'Herbivore':
-                age = dct.get("age")
-                weight = dct.get("weight")
-                animal = Herbivore(age=age, weight=weight)
-                self.herbivores_list.append(animal)
-
+                herbivores.append((dct.get("age"), dct.get("weight")))
             elif get == 'Carnivore':
-                age = dct.get("age")
-                weight = dct.get("weight")
-                animal = Carnivore(age=age, weight=weight)
-                self.carnivores_list.append(animal)
-            else:
-                if get is not None:
-                    raise ValueError('Cant place animals rather than herbivore or carnivore')
+                carnivores.append((dct.get("age"), dct.get("weight")))
+            elif get is not None:
+                raise ValueError('Cant place animals rather than herbivore or carnivore')
+        return herbivores, carnivores
 
     def animals_die(self):
         """
-        Handles removal of dead animals by creating a survivors-list where every surviving animal
-        has been tested to see if died by .is_dying().
-        Then, the list of animals are updated by being set to the list of survivors.
+        Handles removal of dead animals. For each species, the death probabilities of all
+        animals are calculated at once by is_dying_array, with the same probabilities as
+        .is_dying(). The list of animals is then compacted in place to the survivors.
 
         """
+        stream = self.random_streams['death']
+        stream.prepare(self.get_num_animals('Herbivore') + self.get_num_animals('Carnivore'))
+        if self._columnar:
+            self.herbivores.die(stream)
+            self.carnivores.die(stream)
+            return
 
-        survivors_h = [animal for animal in self.herbivores_list if not animal.is_dying()]
-        self.herbivores_list = survivors_h
-
-        survivors_c = [animal for animal in self.carnivores_list if not animal.is_dying()]
-        self.carnivores_list = survivors_c
+        for species, animals in [(Herbivore, self.herbivores_list),
+                                 (Carnivore, self.carnivores_list)]:
+            fitness = species.update_fitness_of_animals(animals)
+            dying = species.is_dying_array(species.weights_of_animals(animals), fitness, stream)
+            animals[:] = compress(animals, ~dying)
 
     def remove_migrated_animals(self, migrated_herb_list, migrated_carni_list):
         """
         Removing all animal objects that has migrated out of this cell.
         Handles the removal by creating a list of animals that did not migrate (did not occur
         in the migrated_list), and then the list of animals are updated by being set to the list
-        of animals that is still in cell.
+        of animals that is still in cell. The migrated animals are looked up by identity in a
+        set, so the removal is linear in the number of animals.
 
         Parameters
         ----------
@@ -82,51 +150,66 @@ class Cell:
             list of Carnivore objects that has migrated to a different cell
         """
 
-        not_migrated_h = [herb for herb in self.herbivores_list if herb not in migrated_herb_list]
-        self.herbivores_list = not_migrated_h
+        migrated = set(map(id, migrated_herb_list))
+        self.herbivores_list = [herb for herb in self.herbivores_list if id(herb) not in migrated]
 
-        not_migrated_c = [carn for carn in self.carnivores_list if carn not in migrated_carni_list]
-        self.carnivores_list = not_migrated_c
+        migrated = set(map(id, migrated_carni_list))
+        self.carnivores_list = [carn for carn in self.carnivores_list if id(carn) not in migrated]
 
     def herb_eat(self):
         """
         Handles the eating for all Herbivores in cell.
         They eat based on appetite parameter F and available fodder in cell.
         Herbivores eat in random order, and can eat as long as there is fodder available.
+        The portions of all herbivores are computed at once by Herbivore.graze_array, and only
+        herbivores that get fodder eat.
 
         """
-        np.random.shuffle(self.herbivores_list)
-        for animal in self.herbivores_list:
-            if self.available_fodder >= animal.get_param_f():
-                self.available_fodder -= animal.eat()
-            elif animal.get_param_f() > self.available_fodder > 0:
-                animal.eat(self.available_fodder)
-                self.available_fodder = 0
+        stream = self.random_streams['feeding']
+        if self._columnar:
+            self.available_fodder = self.herbivores.graze(self.available_fodder, stream)
+            return
+
+        herbivores = self.herbivores_list
+        order, portions, self.available_fodder = Herbivore.graze_array(len(herbivores),
+                                                                       self.available_fodder,
+                                                                       stream)
+        herbivores[:] = [herbivores[i] for i in order.tolist()]
+        for animal, portion in zip(herbivores, portions[portions > 0].tolist()):
+            animal.eat(portion)
 
     def carn_eat(self):
         """
         Handles the eating for all Carnivores in cell.
         Carnivores eat Herbivores. Herbivores are eaten in the order of lowest to highest fitness.
         Carnivores eat/prey in the order of highest to lowest fitness.
-        The list of surviving Herbivores in the cell is updated.
+        The hunt is done by Carnivore.hunt_array, and the list of surviving Herbivores in the
+        cell is updated once after all carnivores have eaten. Afterwards, the herbivores are
+        ordered from lowest to highest fitness and the carnivores from highest to lowest.
 
         Returns
         -------
 
         """
-        # sort herbivores: Lowest to highest fitness
-        self.herbivores_list.sort(key=lambda x: x.calculate_fitness())
+        stream = self.random_streams['feeding']
+        stream.prepare(self.get_num_animals('Herbivore'))
+        if self._columnar:
+            self.carnivores.hunt(self.herbivores, stream)
+            return
 
-        # sort carnivores: Highest to lowest fitness
-        self.carnivores_list.sort(key=lambda x: x.calculate_fitness(), reverse=True)
+        herbivores = self.herbivores_list
+        carnivores = self.carnivores_list
+        herb_fitness = Herbivore.update_fitness_of_animals(herbivores)
+        carn_fitness = Carnivore.update_fitness_of_animals(carnivores)
 
-        for carnivore in self.carnivores_list:
-            eaten_herbivores = carnivore.eat(self.herbivores_list)
-            herb_survivors = [herb for herb in self.herbivores_list if herb not in eaten_herbivores]
+        prey_order, hunter_order, eaten, carn_weight, _ = Carnivore.hunt_array(
+            Carnivore.ages_of_animals(carnivores), Carnivore.weights_of_animals(carnivores),
+            carn_fitness, Herbivore.weights_of_animals(herbivores), herb_fitness, stream)
 
-            # Improvement for later: check if herb_survivors needs to be sorted before sorting
-            herb_survivors.sort(key=lambda x: x.calculate_fitness())
-            self.herbivores_list = herb_survivors
+        for carnivore, weight in zip(carnivores, carn_weight.tolist()):
+            carnivore.weight = weight
+        carnivores[:] = [carnivores[i] for i in hunter_order.tolist()]
+        herbivores[:] = [herbivores[i] for i in prey_order[~eaten[prey_order]].tolist()]
 
     def animals_eat(self):
         """
@@ -142,19 +225,27 @@ class Cell:
         and if a mating partner exists (no genders), checks if both parent animals
         have proper weight.
         Then they will make a new offspring with a probability calculation based on fitness.
-        Weight checks and probability calculations are handled in create_newborn method.
+        Weight checks and probability calculations are done for all animals of a species at
+        once by procreation_array, with the same conditions as the create_newborn method.
         After all animals try to procreate, the newborn animals are added to the fauna.
 
         """
-        for animal in self.herbivores_list:
-            offspring = animal.create_newborn(len(self.herbivores_list))
-            if offspring is not None:
-                self.newborn_herb_list.append(offspring)
+        stream = self.random_streams['procreation']
+        stream.prepare(self.get_num_animals('Herbivore') + self.get_num_animals('Carnivore'))
+        if self._columnar:
+            self.herbivores.procreate(stream)
+            self.carnivores.procreate(stream)
+            return
 
-        for animal in self.carnivores_list:
-            offspring = animal.create_newborn(len(self.carnivores_list))
-            if offspring is not None:
-                self.newborn_carn_list.append(offspring)
+        for species, animals, newborns in [
+                (Herbivore, self.herbivores_list, self.newborn_herb_list),
+                (Carnivore, self.carnivores_list, self.newborn_carn_list)]:
+            fitness = species.update_fitness_of_animals(animals)
+            mothers, newborn_weight = species.procreation_array(
+                species.weights_of_animals(animals), fitness, stream)
+            for mother, weight in zip(mothers.tolist(), newborn_weight.tolist()):
+                animals[mother].check_mother_minus_newborn_weight_conditions(weight)
+                newborns.append(species(weight=weight))
 
         # adding newborn to fauna after all animans procreate to not add on iterating list
         self.add_newborn_to_fauna()
@@ -176,43 +267,129 @@ class Cell:
         -------
 
         """
+        if self._columnar:
+            self.herbivores.grow_older()
+            self.carnivores.grow_older()
+            return
         for animal in self.herbivores_list:
             animal.grow_older()
 
         for animal in self.carnivores_list:
             animal.grow_older()
 
-    def migrate(self, adj_cells):
+    def migrate(self, adj_cells, habitable=None):
         """
         Handles annual migration by first checking if animal will migrate, then randomly choosing
-        the cell which the animal will migrate to.
+        the cell which the animal will migrate to. Animals whose chosen cell is not habitable
+        (Water) stay.
+        The destinations of all animals of a species are drawn at once by migration_array,
+        and each population is partitioned by destination in a single pass, so the migrated
+        animals are moved as whole batches.
 
         Parameters
         ----------
         adj_cells: list of objects
             List of the four neighbouring cells which animals can migrate to from current cell
+        habitable: np.ndarray of bool, optional
+            habitability of the four neighbouring cells, taken from the cells if not given
 
         Returns
         -------
         migration_dict:
-            dictionary of the destination cell (keys) and all migrated animals to this cell (values)
+            dictionary of the destination cell (keys) and tuple of the herbivores and carnivores
+            that migrated to this cell (values). The migrated animals have already been removed
+            from this cell, and are lists of animals for the object backend and Population for
+            the columnar backend.
+
+        """
+        stream = self.random_streams['migration']
+        stream.prepare(self.get_num_animals('Herbivore') + self.get_num_animals('Carnivore'))
+        if habitable is None:
+            habitable = [cell.habitable for cell in adj_cells]
+        blocked = np.flatnonzero(np.logical_not(habitable)).tolist()
+
+        if self._columnar:
+            herb_moved = self.herbivores.split(
+                self._destinations(self.herbivores.migration_directions(stream), blocked),
+                len(adj_cells))
+            carn_moved = self.carnivores.split(
+                self._destinations(self.carnivores.migration_directions(stream), blocked),
+                len(adj_cells))
+        else:
+            herb_moved = self._split_animals(Herbivore, self.herbivores_list, adj_cells,
+                                             blocked, stream)
+            carn_moved = self._split_animals(Carnivore, self.carnivores_list, adj_cells,
+                                             blocked, stream)
 
-        """
         migration_dct = {}
+        for cell, herbivores, carnivores in zip(adj_cells, herb_moved, carn_moved):
+            if len(herbivores) > 0 or len(carnivores) > 0:
+                migration_dct[cell] = (herbivores, carnivores)
+        return migration_dct
 
-        animal_list = self.herbivores_list + self.carnivores_list
+    @staticmethod
+    def _destinations(directions, blocked):
+        """
+        Sets the direction of animals that chose a cell they can not migrate to, to -1 (stay).
 
-        for animal in animal_list:
-            if animal.check_if_migrates():
-                rand_choice = np.random.choice([0, 1, 2, 3])
-                cell_to_migrate = adj_cells[rand_choice]
+        Parameters
+        ----------
+        directions: np.ndarray of int
+        blocked: list of int
+            directions of the neighbouring cells that are not habitable
 
-                if cell_to_migrate in migration_dct:
-                    migration_dct[cell_to_migrate].append(animal)
-                else:
-                    migration_dct[cell_to_migrate] = [animal]
+        Returns
+        -------
+        destinations: np.ndarray of int
+        """
+        if blocked:
+            directions[np.isin(directions, blocked)] = -1
+        return directions
 
-        return migration_dct
+    def _split_animals(self, species, animals, adj_cells, blocked, stream):
+        """
+        Migration of the animal objects of one species for the object backend.
+        The list of animals is compacted in place to the animals that stay.
+
+        Parameters
+        ----------
+        species: class
+        animals: list of objects
+        adj_cells: list of objects
+        blocked: list of int
+        stream: RandomStream
+
+        Returns
+        -------
+        moved: list of lists
+            the migrated animal objects for each neighbouring cell
+        """
+        fitness = species.update_fitness_of_animals(animals)
+        has_migrated = np.array([animal.has_migrated_this_year for animal in animals], dtype=bool)
+        directions = species.migration_array(fitness, has_migrated, stream)
+        for index in np.flatnonzero(directions >= 0).tolist():
+            animals[index].has_migrated_this_year = True
+
+        groups = partition(self._destinations(directions, blocked), len(adj_cells))
+        moved = [[animals[i] for i in index.tolist()] for index in groups[1:]]
+        animals[:] = [animals[i] for i in groups[0].tolist()]
+        return moved
+
+    def add_migrated_animals(self, herbivores, carnivores):
+        """
+        Adds a batch of migrated animals to this cell.
+
+        Parameters
+        ----------
+        herbivores: list of objects or Population
+        carnivores: list of objects or Population
+        """
+        if self._columnar:
+            self.herbivores.add_population(herbivores)
+            self.carnivores.add_population(carnivores)
+            return
+        self.herbivores_list.extend(herbivores)
+        self.carnivores_list.extend(carnivores)
 
     def get_fodder(self):
         """
@@ -234,13 +411,116 @@ class Cell:
             Animal species: Herbivore or Carnivore
         """
 
-        if species is Herbivore.__name__:
+        if species == Herbivore.__name__:
+            if self._columnar:
+                return len(self.herbivores)
             return len(self.herbivores_list)
-        elif species is Carnivore.__name__:
+        elif species == Carnivore.__name__:
+            if self._columnar:
+                return len(self.carnivores)
             return len(self.carnivores_list)
         else:
             raise ValueError('get_num_animals: must specify a valid specie to count')
 
+    def animal_properties(self, species):
+        """
+        Age, weight and fitness of all animals of a species in the cell.
+        Raises value error if specie is not valid
+
+        Parameters
+        ----------
+        species: string
+            Animal species: Herbivore or Carnivore
+
+        Returns
+        -------
+        age, weight, fitness: np.ndarray
+        """
+        if species not in (Herbivore.__name__, Carnivore.__name__):
+            raise ValueError('animal_properties: must specify a valid specie')
+        herbivores = species == Herbivore.__name__
+        if self._columnar:
+            population = self.herbivores if herbivores else self.carnivores
+            population.refresh_fitness()
+            return population.age, population.weight, population.fitness
+        species_class = Herbivore if herbivores else Carnivore
+        animals = self.herbivores_list if herbivores else self.carnivores_list
+        return (species_class.ages_of_animals(animals),
+                species_class.weights_of_animals(animals),
+                species_class.update_fitness_of_animals(animals))
+
+    def animal_state(self, species):
+        """
+        Age, weight, migration flag and cached fitness of all animals of a species in the
+        cell, in the order they are kept. Fitness not calculated yet, or calculated before
+        the parameters were last set, is NaN.
+
+        Parameters
+        ----------
+        species: string
+            Animal species: Herbivore or Carnivore
+
+        Returns
+        -------
+        age, weight, has_migrated, fitness: np.ndarray
+        """
+        generation = Animal._params_generation
+        if self._columnar:
+            population = self.herbivores if species == Herbivore.__name__ else self.carnivores
+            fitness = population.fitness.copy()
+            if population._fitness_generation != generation:
+                fitness[:] = np.nan
+            return (population.age.copy(), population.weight.copy(),
+                    population.has_migrated.copy(), fitness)
+        animals = self.herbivores_list if species == Herbivore.__name__ \
+            else self.carnivores_list
+        return (np.array([animal.age for animal in animals], dtype=int),
+                np.array([animal.weight for animal in animals], dtype=float),
+                np.array([animal.has_migrated_this_year for animal in animals], dtype=bool),
+                np.array([np.nan if animal._fitness is None or
+                          animal._fitness_generation != generation else animal._fitness
+                          for animal in animals], dtype=float))
+
+    def restore_animals(self, species, age, weight, has_migrated, fitness):
+        """
+        Adds animals with the state given by animal_state to the cell.
+
+        Parameters
+        ----------
+        species: string
+            Animal species: Herbivore or Carnivore
+        age: np.ndarray
+        weight: np.ndarray
+        has_migrated: np.ndarray of bool
+        fitness: np.ndarray
+            cached fitness, NaN if not calculated
+        """
+        species_class = Herbivore if species == Herbivore.__name__ else Carnivore
+        if self._columnar:
+            population = Population(species_class)
+            calculated = ~np.isnan(fitness)
+            fitness = np.where(calculated, fitness, 0.)
+            population.extend(age.astype(int), weight.astype(float), has_migrated.astype(bool),
+                              fitness)
+            population.update_fitness(np.flatnonzero(~calculated))
+            self.add_migrated_animals(*((population, Population(Carnivore))
+                                        if species_class is Herbivore
+                                        else (Population(Herbivore), population)))
+            return
+
+        animals = []
+        for animal_age, animal_weight, animal_migrated, animal_fitness in zip(
+                age.tolist(), weight.tolist(), has_migrated.tolist(), fitness.tolist()):
+            animal = species_class(age=animal_age, weight=animal_weight)
+            animal.has_migrated_this_year = animal_migrated
+            if not np.isnan(animal_fitness):
+                animal._fitness = animal_fitness
+            animals.append(animal)
+        if species_class is Herbivore:
+            self.add_migrated_animals(animals, [])
+        else:
+            self.add_migrated_animals([], animals)
+
     @property
     def cell_fauna_count(self):
         """
@@ -258,13 +538,36 @@ class Cell:
 
 class Water(Cell):
     """
-    Water subclass of base class Cell
+    Water subclass of base class Cell.
+    A Water cell never holds animals or fodder, so one Water object can stand for all Water
+    cells of an Island. The object can not be changed after it is created.
     """
-    def __init__(self):
+    habitable = False
+
+    def __init__(self, backend='object', random_streams=None):
         """
         Constructor for Water subclass of Cell baseclass
+
+        Parameters
+        ----------
+        backend: str
+        random_streams: dict, optional
         """
-        super().__init__()
+        super().__init__(backend, random_streams)
+        object.__setattr__(self, '_frozen', True)
+
+    def __setattr__(self, name, value):
+        """
+        Raises AttributeError if an attribute is set after the cell is created.
+
+        Parameters
+        ----------
+        name: str
+        value: attribute value
+        """
+        if getattr(self, '_frozen', False):
+            raise AttributeError('Water Cell can not be changed')
+        object.__setattr__(self, name, value)
 
     def set_fodder(self):
         """
@@ -284,18 +587,31 @@ class Water(Cell):
         """
         raise ValueError('Cant place animals in Water Cell')
 
+    def add_migrated_animals(self, herbivores, carnivores):
+        """
+        Method for adding migrated animals to water; animals can not migrate to water. Will
+        raise Value error.
+
+        Parameters
+        ----------
+        herbivores: migrated herbivores (will not be added)
+        carnivores: migrated carnivores (will not be added)
+        """
+        raise ValueError('Cant place animals in Water Cell')
+
     def animals_eat(self):
         """
         Method for eating in Water is passed.
         """
         pass
 
-    def migrate(self, adj_cells):
+    def migrate(self, adj_cells, habitable=None):
         """
         Method for migrating animals in Water Cell is passed.
         Parameters
         ----------
         adj_cells: adjacent cells (will not be used)
+        habitable: habitability of adjacent cells (will not be used)
         """
         pass
 
@@ -304,11 +620,16 @@ class Desert(Cell):
     """
     Desert subclass from Cell base class.
     """
-    def __init__(self):
+    def __init__(self, backend='object', random_streams=None):
         """
         Constructor for Water subclass of Cell baseclass
+
+        Parameters
+        ----------
+        backend: str
+        random_streams: dict, optional
         """
-        super().__init__()
+        super().__init__(backend, random_streams)
 
     def set_fodder(self):
         """
@@ -321,13 +642,19 @@ class Highland(Cell):
     """
     Highland subclass of Cell base class
     """
-    def __init__(self):
+    parameters = {'f_max': 300.0}
+
+    def __init__(self, backend='object', random_streams=None):
         """
         Constructor class for Highland base class.
         Parameter for fodder max and available fodder is set.
+
+        Parameters
+        ----------
+        backend: str
+        random_streams: dict, optional
         """
-        super().__init__()
-        self.parameters = {'f_max': 300.0}
+        super().__init__(backend, random_streams)
         self.available_fodder = self.parameters['f_max']
 
     def set_fodder(self):
@@ -336,17 +663,18 @@ class Highland(Cell):
         """
         self.available_fodder = self.parameters['f_max']
 
-    def set_given_parameters(self, given_parameters):
+    @classmethod
+    def set_given_parameters(cls, given_parameters):
         """
-        Sets the user defined parameters.
+        Sets the user defined parameters for all Highland cells.
         Parameters
         ----------
         given_parameters: dict
         """
 
         for parameter in given_parameters:
-            if parameter in self.parameters:
-                self.parameters[parameter] = given_parameters[parameter]
+            if parameter in cls.parameters:
+                cls.parameters[parameter] = given_parameters[parameter]
             else:
                 raise RuntimeError('Unknown parameter, ' +
                                    str(parameter) +
@@ -354,13 +682,19 @@ class Highland(Cell):
 
 
 class Lowland(Cell):
-    def __init__(self):
+    parameters = {'f_max': 800.0}
+
+    def __init__(self, backend='object', random_streams=None):
         """
          Constructor class for Highland base class.
          Parameter for fodder max and available fodder is set.
+
+         Parameters
+         ----------
+         backend: str
+         random_streams: dict, optional
          """
-        super().__init__()
-        self.parameters = {'f_max': 800.0}
+        super().__init__(backend, random_streams)
         self.available_fodder = self.parameters['f_max']
 
     def set_fodder(self):
@@ -369,17 +703,18 @@ class Lowland(Cell):
         """
         self.available_fodder = self.parameters['f_max']
 
-    def set_given_parameters(self, given_parameters):
+    @classmethod
+    def set_given_parameters(cls, given_parameters):
         """
-        Sets the user defined parameters that applies to Savannah, Jungle.
+        Sets the user defined parameters for all Lowland cells.
         Parameters
         ----------
         given_parameters: dict
         """
 
         for parameter in given_parameters:
-            if parameter in self.parameters:
-                self.parameters[parameter] = given_parameters[parameter]
+            if parameter in cls.parameters:
+                cls.parameters[parameter] = given_parameters[parameter]
             else:
                 raise RuntimeError('Unknown parameter, ' +
                                    str(parameter) +
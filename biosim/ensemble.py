@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+__author__ = "Anja Stene, Student NMBU", "Ghazal Azadi, Student NMBU"
+__email__ = "anja.stene@nmbu.no", "ghazal.azadi@nmbu.no"
+
+from biosim.simulation import BioSim
+import multiprocessing
+import numpy as np
+
+SPECIES = ('Herbivore', 'Carnivore')
+
+
+def _run_replicate(scenario, seed):
+    """
+    Runs one replicate of the scenario without graphics.
+
+    Parameters
+    ----------
+    scenario: dict
+        see run_ensemble
+    seed: int
+
+    Returns
+    -------
+    counts: np.ndarray of int
+        number of animals per species (columns, in the order of SPECIES) at the start and
+        after every year (rows)
+    """
+    sim = BioSim(scenario['island_map'], seed, scenario['ini_pop'],
+                 backend=scenario.get('backend', 'object'),
+                 rng_mode=scenario.get('rng_mode', 'block'))
+    for species, params in scenario.get('animal_parameters', {}).items():
+        sim.set_animal_parameters(species, params)
+
+    counts = np.zeros((scenario['num_years'] + 1, len(SPECIES)), dtype=int)
+    for year in range(scenario['num_years'] + 1):
+        if year > 0:
+            sim.simulate(1, vis_years=None)
+        num_per_species = sim.num_animals_per_species
+        counts[year] = [num_per_species[species] for species in SPECIES]
+    return counts
+
+
+def run_ensemble(scenario, seeds, quantiles=(0.05, 0.5, 0.95), num_workers=None):
+    """
+    Runs the same scenario with several seeds in a pool of worker processes, and returns
+    statistics of the number of animals per species for every year.
+    The replicates run without graphics, and only their animal counts are sent back to
+    this process.
+
+    Parameters
+    ----------
+    scenario: dict
+        'island_map' (str), 'ini_pop' (list of dicts) and 'num_years' (int), and optionally
+        'animal_parameters' (dict of species and parameters), 'backend' and 'rng_mode'
+    seeds: list of int
+        one replicate is run for each seed
+    quantiles: tuple of float
+        quantiles to calculate, between 0 and 1
+    num_workers: int, optional
+        number of worker processes, the number of CPUs if not given
+
+    Returns
+    -------
+    statistics: dict
+        'year' (np.ndarray of the years, starting with 0 before the first year),
+        'quantiles' (the given quantiles) and for each species a dict with 'mean'
+        (np.ndarray per year) and 'quantiles' (np.ndarray, one row per quantile)
+    """
+    if len(seeds) == 0:
+        raise ValueError('At least one seed must be given')
+    for key in ['island_map', 'ini_pop', 'num_years']:
+        if key not in scenario:
+            raise ValueError('Scenario must give ' + key)
+
+    if num_workers is None:
+        num_workers = multiprocessing.cpu_count()
+    num_workers = max(1, min(num_workers, len(seeds)))
+    with multiprocessing.Pool(num_workers) as pool:
+        counts = np.array(pool.starmap(_run_replicate, [(scenario, seed) for seed in seeds]))
+
+    statistics = {'year': np.arange(scenario['num_years'] + 1),
+                  'quantiles': tuple(quantiles)}
+    for column, species in enumerate(SPECIES):
+        species_counts = counts[:, :, column]
+        statistics[species] = {'mean': species_counts.mean(axis=0),
+                               'quantiles': np.quantile(species_counts, quantiles, axis=0)}
+    return statistics
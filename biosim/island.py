@@ -5,25 +5,44 @@ __email__ = "anja.stene@nmbu.no", "ghazal.azadi@nmbu.no"
 
 from biosim.cell import Lowland, Highland, Water, Desert
 from biosim.animal import Carnivore, Herbivore
+from biosim.randomstream import phase_streams, select_cell
 import numpy as np
+import time
 
 
 class Island:
     """
     Island class created by a map (string). Consists of Cell objects of different types.
+
+    Only land cells carry state. They are kept in a dictionary by flat (row-major) index and
+    created when they are first needed. All Water cells of the island are one shared Water
+    object, which can not hold animals.
     """
+    phases = ('fodder', 'feeding', 'procreation', 'death', 'aging', 'migration')
 
-    def __init__(self, island_map):
+    def __init__(self, island_map, backend='object', rng_mode='block', seed=None):
         """
         Constructor class for the Island
         Parameters
         ----------
         island_map: string
+        backend: str
+            storage of animals in the cells, 'object' or 'columnar' (see Cell)
+        rng_mode: str
+            mode of the random streams shared by all cells, 'block' or 'exact'
+            (see RandomStream)
+        seed: int, optional
+            seed of the random streams, drawn from np.random if not given
         """
         self._map = island_map
-        self._island_map = self._string_to_np_array()
-        self._not_surrounded_by_ocean(self._island_map)
-
+        self._backend = backend
+        if seed is None:
+            seed = np.random.randint(2**32)
+        self._seed = seed
+        self._random_streams = phase_streams(rng_mode, seed)
+        self._year = 0
+        # flat index of the first cell in the random streams, see StripeIsland
+        self._index_offset = 0
         self._landscape_classes = {'W': Water,
                                    'L': Lowland,
                                    'H': Highland,
@@ -31,30 +50,162 @@ class Island:
         self._animal_classes = {'Carnivore': Carnivore,
                                 'Herbivore': Herbivore}
 
-        self._cells = self.create_map_of_landscape_objects()
-        rows = self._cells.shape[0]
-        cols = self._cells.shape[1]
+        self._island_map = self._string_to_np_array()
+        self._not_surrounded_by_ocean(self._island_map)
+
+        rows, cols = self._island_map.shape
         self.cells_dims = rows, cols
+        # land cells are created when they are first needed, see _cell
+        self._land_cells = {}
+        self._water = Water(backend, self._random_streams)
+        self._cell_array = None
+        self._flat_codes = self._island_map.ravel()
+        self._neighbours = self._neighbour_table(rows, cols)
+        self._habitable = self._flat_codes != ord('W')
+        self._occupied = np.zeros(rows * cols, dtype=bool)
+        # number of animals per species (rows) in every cell (columns), and on the island
+        self._species_row = {'Herbivore': 0, 'Carnivore': 1}
+        self._count_grid = np.zeros((len(self._species_row), rows * cols), dtype=int)
+        self._totals = [0] * len(self._species_row)
+        self._grazed = np.zeros(rows * cols, dtype=bool)
+        self.phase_times = None
 
     def get_cells(self):
         """
-        Returns all cells on Island
+        Returns all cells on Island. Cells that are not created yet are created first.
+        All Water cells are the same Water object.
         Returns
         -------
         _cells: all cell objects in numpy.ndarray
         """
-        return self._cells
+        if self._cell_array is None:
+            self._cell_array = self.create_map_of_landscape_objects()
+        return self._cell_array
+
+    @property
+    def _cells(self):
+        """
+        All cell objects in numpy.ndarray, see get_cells
+        """
+        return self.get_cells()
+
+    def _cell(self, index):
+        """
+        Gets the cell with the given flat index, creating it if it does not exist yet.
+        A cell is created with full fodder, so a land cell that is created late is the same
+        as a cell created together with the island. Water cells are the shared Water object.
+
+        Parameters
+        ----------
+        index: int
+            flat (row-major) index of the cell
+
+        Returns
+        -------
+        cell: cell object
+        """
+        if not self._habitable[index]:
+            return self._water
+        cell = self._land_cells.get(index)
+        if cell is None:
+            cell = self._create_cell(chr(self._flat_codes[index]))
+            self._land_cells[index] = cell
+        return cell
 
     def annual_cycle(self):
         """
-        Annual Cycle of happenings on the Island
+        Annual Cycle of happenings on the Island.
+        The happenings inside a cell (fodder, eating, procreation, death and aging) are done
+        in a single pass over the occupied cells, one cell at a time, followed by a separate
+        pass for migration between cells. Water cells and empty cells are not visited, except
+        that cells grazed last year regrow their fodder.
+        If timing is enabled, the time used by each phase is added to phase_times.
+
+        Every cell draws its random numbers from its own streams for the year (see
+        RandomStream), so the result for a given seed does not depend on the backend or on
+        how the island is split between processes.
+        """
+        if self.phase_times is not None:
+            self._timed_annual_cycle()
+        else:
+            self._cell_phases()
+            self.migration()
+        self._year += 1
+
+    def _cell_phases(self):
+        """
+        Happenings inside the cells, in a single pass over the occupied cells.
         """
-        self.grow_fodder()
-        self.feed_animals()
-        self.procreation()
-        self.death()
-        self.aging()
+        occupied = self._start_of_year()
+        for index in occupied:
+            cell = self._land_cells[index]
+            self._select_streams(index)
+            cell.set_fodder()
+            cell.animals_eat()
+            cell.procreation()
+            cell.animals_die()
+            cell.animals_age_by_one_year()
+            self._update_counts(index)
+
+    def _select_streams(self, index):
+        """
+        Selects the random streams of a cell in the current year.
+
+        Parameters
+        ----------
+        index: int
+            flat index of the cell
+        """
+        select_cell(self._random_streams, self._year, index + self._index_offset)
+
+    def _start_of_year(self):
+        """
+        Regrows the fodder in cells that were grazed last year and are empty now. Occupied
+        cells regrow their fodder when they are visited. The occupied cells are the grazed
+        cells of this year.
+
+        Returns
+        -------
+        occupied: list of int
+            flat indices of the occupied cells, in row-major order
+        """
+        for index in np.flatnonzero(self._grazed & ~self._occupied).tolist():
+            self._land_cells[index].set_fodder()
+        self._grazed[:] = self._occupied
+        return np.flatnonzero(self._occupied).tolist()
+
+    def enable_timing(self):
+        """
+        Starts measuring the time used by each phase of the annual cycle.
+        The times are accumulated over the years in phase_times, a dictionary of phase name
+        (keys) and seconds (values). Calling it again resets the times.
+        """
+        self.phase_times = dict.fromkeys(self.phases, 0.)
+
+    def _timed_annual_cycle(self):
+        """
+        Annual cycle as in annual_cycle, with the time used by each phase of each cell added
+        to phase_times.
+        """
+        clock = time.perf_counter
+        times = self.phase_times
+        start = clock()
+        occupied = self._start_of_year()
+        times['fodder'] += clock() - start
+        for index in occupied:
+            cell = self._land_cells[index]
+            self._select_streams(index)
+            for phase, happening in zip(self.phases, (cell.set_fodder, cell.animals_eat,
+                                                      cell.procreation, cell.animals_die,
+                                                      cell.animals_age_by_one_year)):
+                start = clock()
+                happening()
+                times[phase] += clock() - start
+            self._update_counts(index)
+
+        start = clock()
         self.migration()
+        times['migration'] += clock() - start
 
     @staticmethod
     def _edges(map_array):
@@ -85,47 +236,51 @@ class Island:
         """
         edges = self._edges(map_array)
         for side in edges:
-            if not np.all(side == 'W'):
+            if not np.all(side == ord('W')):
                 raise ValueError('The given geography string is not valid.'
                                  'The Island must be surrounded by Water')
 
     def _string_to_np_array(self):
         """
-        Converts string map to numpy array with the same dimensions.
-        Raises ValueError if dimensions not valid
+        Converts string map to numpy array with the same dimensions, holding the character
+        code (uint8) of the landscape of every cell. The whole map is converted at once.
+        Raises ValueError if dimensions not valid or a landscape type is not valid.
 
         Returns
         -------
-        char_map: np.ndarray
+        code_map: np.ndarray of np.uint8
         """
-        map_string_clean = self._map.replace(' ', '')
+        lines = self._map.replace(' ', '').splitlines()
+
+        if len(set(map(len, lines))) > 1:
+            raise ValueError('Inconsistent dimensions in map')
 
-        len_ctr = len(map_string_clean.splitlines()[0])
-        for i in map_string_clean.splitlines():
-            if not len_ctr == len(i):
-                raise ValueError('Inconsistent dimensions in map')
+        map_bytes = ''.join(lines).encode('ascii', errors='replace')
+        code_map = np.frombuffer(map_bytes, dtype=np.uint8).reshape(len(lines), -1)
 
-        char_map = np.array(
-            [[j for j in i] for i in map_string_clean.splitlines()])
+        valid = np.zeros(256, dtype=bool)
+        valid[[ord(letter) for letter in self._landscape_classes]] = True
+        not_valid = ~valid[code_map]
+        if not_valid.any():
+            cell_letter = chr(code_map.flat[np.argmax(not_valid)])
+            raise ValueError(cell_letter + " is not a valid landscape type")
 
-        return char_map
+        return code_map
 
     def create_map_of_landscape_objects(self):
         """
-        Builds array of same dimension for elements in geogr_array. Then,
-        iterate through the given character array and build the object of
-        landscapes for each character. Afterwards, save the landscape class and
-        instantiate the object.
+        Creates the landscape objects of all land cells that are not created yet, based on
+        the character of each cell in the map, and places them in an array together with the
+        shared Water object.
 
         Returns
         -------
         cells_array: np.ndarray of landscape objects
         """
-        cells_array = np.empty(self._island_map.shape, dtype=object)
-        for i in np.arange(self._island_map.shape[0]):
-            for j in np.arange(self._island_map.shape[1]):
-                cell_letter = self._island_map[i][j]
-                cells_array[i][j] = self._create_cell(cell_letter)
+        cells_array = np.full(self.cells_dims, self._water, dtype=object)
+        flat_cells = cells_array.ravel()
+        for index in np.flatnonzero(self._habitable).tolist():
+            flat_cells[index] = self._cell(index)
         return cells_array
 
     def _create_cell(self, cell_letter):
@@ -142,7 +297,7 @@ class Island:
         """
 
         if cell_letter in self._landscape_classes:
-            return self._landscape_classes[cell_letter]()
+            return self._landscape_classes[cell_letter](self._backend, self._random_streams)
         else:
             raise ValueError(cell_letter + " is not a valid landscape type")
 
@@ -162,18 +317,34 @@ class Island:
         adj_cells_list: list
             List of 4 cell objects representing the adjacent cells
         """
-        rows, cols = self.cells_dims
-        adj_cells_list = []
-        if x > 0:
-            adj_cells_list.append(self._cells[x - 1, y])
-        if x + 1 < rows:
-            adj_cells_list.append(self._cells[x + 1, y])
-        if y > 0:
-            adj_cells_list.append(self._cells[x, y - 1])
-        if y + 1 < cols:
-            adj_cells_list.append(self._cells[x, y + 1])
+        neighbours = self._neighbours[x * self.cells_dims[1] + y].tolist()
+        adj_cells_list = [self._cell(index) for index in neighbours if index >= 0]
         return adj_cells_list
 
+    @staticmethod
+    def _neighbour_table(rows, cols):
+        """
+        Flat indices of the four neighbours of every cell, in the order up, down, left and
+        right. Neighbours outside the map are -1.
+
+        Parameters
+        ----------
+        rows: int
+        cols: int
+
+        Returns
+        -------
+        neighbours: np.ndarray of int
+            four neighbour indices for each flat cell index, shape (rows * cols, 4)
+        """
+        index = np.arange(rows * cols, dtype=np.int32).reshape(rows, cols)
+        neighbours = np.full((rows, cols, 4), -1, dtype=np.int32)
+        neighbours[1:, :, 0] = index[:-1, :]
+        neighbours[:-1, :, 1] = index[1:, :]
+        neighbours[:, 1:, 2] = index[:, :-1]
+        neighbours[:, :-1, 3] = index[:, 1:]
+        return neighbours.reshape(rows * cols, 4)
+
     def get_adj_cells(self, x, y):
         """
         Gets the four adjacent cells of current location (x,y)
@@ -191,7 +362,9 @@ class Island:
 
     def total_num_animals_per_species(self, species):
         """
-        Calculates total number of animals per kind on Island.
+        Total number of animals per kind on Island. The totals are updated together with
+        the count grid, so no cells are visited.
+        Raises ValueError if species is not valid.
 
         Parameters
         ----------
@@ -202,13 +375,149 @@ class Island:
         num_animals: int
             total number of animals of specified specie on Island
         """
-        num_animals = 0
-        rows, cols = self.cells_dims
-        for x in range(0, rows):
-            for y in range(0, cols):
-                cell = self._cells[x, y]
-                num_animals += cell.get_num_animals(species)
-        return num_animals
+        if species not in self._species_row:
+            raise ValueError('total_num_animals_per_species: must specify a valid specie '
+                             'to count')
+        return self._totals[self._species_row[species]]
+
+    def animal_count_grid(self, species):
+        """
+        Number of animals of a species in every cell. The grid is updated whenever animals
+        are placed, and after the happenings in a cell and the migration from it, and is
+        returned as a read-only view without copying.
+        Raises ValueError if species is not valid.
+
+        Parameters
+        ----------
+        species: str
+
+        Returns
+        -------
+        count_grid: np.ndarray of int
+            same dimensions as the map
+        """
+        if species not in self._species_row:
+            raise ValueError('animal_count_grid: must specify a valid specie to count')
+        count_grid = self._count_grid[self._species_row[species]].reshape(self.cells_dims)
+        count_grid.flags.writeable = False
+        return count_grid
+
+    def animal_properties(self, species):
+        """
+        Age, weight and fitness of all animals of a species on the Island, see
+        Cell.animal_properties.
+
+        Parameters
+        ----------
+        species: str
+
+        Returns
+        -------
+        properties: dict
+            'age', 'weight' and 'fitness' (keys) and np.ndarray (values)
+        """
+        if species not in self._species_row:
+            raise ValueError('Unknown species, ' + str(species))
+        per_cell = [cell.animal_properties(species) for _, cell in self.occupied_cells()]
+        if not per_cell:
+            return {name: np.zeros(0) for name in ('age', 'weight', 'fitness')}
+        return {name: np.concatenate(values).astype(float)
+                for name, values in zip(('age', 'weight', 'fitness'), zip(*per_cell))}
+
+    def get_state(self):
+        """
+        Full state of the Island as NumPy arrays: the year, the seed, the fodder of every
+        land cell created, and the age, weight, migration flag and cached fitness of every
+        animal, in the order they are kept in their cell. The random streams are given by the
+        seed and the year, see RandomStream.
+
+        Returns
+        -------
+        state: dict
+            name (keys) and np.ndarray (values), see set_state
+        """
+        indices = sorted(self._land_cells)
+        cells = [self._land_cells[index] for index in indices]
+        state = {'year': np.array(self._year),
+                 'seed': np.array(self._seed),
+                 'grazed': self._grazed.copy(),
+                 'cell_index': np.array(indices, dtype=int),
+                 'fodder': np.array([cell.available_fodder for cell in cells], dtype=float),
+                 'f_max': np.array([cell.parameters['f_max'] if hasattr(cell, 'parameters')
+                                    else np.nan for cell in cells], dtype=float)}
+        for species in self._species_row:
+            per_cell = [cell.animal_state(species) for cell in cells]
+            state[species + '_cell'] = np.repeat(state['cell_index'],
+                                                 [len(values[0]) for values in per_cell])
+            for field, name in enumerate(('age', 'weight', 'has_migrated', 'fitness')):
+                state[species + '_' + name] = np.concatenate(
+                    [values[field] for values in per_cell]) if per_cell else np.zeros(0)
+        return state
+
+    def set_state(self, state):
+        """
+        Restores the state given by get_state, on a new Island made from the same map with
+        the same seed. Raises ValueError if the seed is not the same.
+
+        Parameters
+        ----------
+        state: dict
+            name (keys) and np.ndarray (values), see get_state
+        """
+        if int(state['seed']) != self._seed:
+            raise ValueError('The state was saved with seed ' + str(int(state['seed'])) +
+                             ', not ' + str(self._seed))
+        self._year = int(state['year'])
+        self._grazed = np.array(state['grazed'], dtype=bool)
+        for index, fodder, f_max in zip(state['cell_index'].tolist(), state['fodder'].tolist(),
+                                        state['f_max'].tolist()):
+            cell = self._cell(index)
+            if not np.isnan(f_max):
+                type(cell).set_given_parameters({'f_max': f_max})
+            cell.available_fodder = fodder
+
+        for species in self._species_row:
+            animal_cells = state[species + '_cell']
+            for index in np.unique(animal_cells).tolist():
+                start, stop = np.searchsorted(animal_cells, [index, index + 1])
+                self._cell(index).restore_animals(
+                    species, *(state[species + '_' + name][start:stop]
+                               for name in ('age', 'weight', 'has_migrated', 'fitness')))
+        for index in state['cell_index'].tolist():
+            self._update_counts(index)
+
+    def _update_counts(self, index):
+        """
+        Updates the count grid, the totals and the occupied cells for one cell, after
+        animals have been added to or removed from it.
+
+        Parameters
+        ----------
+        index: int
+            flat index of the cell
+        """
+        cell = self._land_cells[index]
+        occupied = False
+        for species, row in self._species_row.items():
+            num_animals = cell.get_num_animals(species)
+            self._totals[row] += num_animals - int(self._count_grid[row, index])
+            self._count_grid[row, index] = num_animals
+            occupied = occupied or num_animals > 0
+        self._occupied[index] = occupied
+
+    def occupied_cells(self):
+        """
+        Gets the cells with animals. The index of occupied cells is updated when animals are
+        placed, and after the happenings of each year.
+
+        Returns
+        -------
+        occupied_cells: list of tuples
+            location (x, y) and cell object of every occupied cell, in row-major order
+        """
+        cols = self.cells_dims[1]
+        return [(divmod(index, cols), self._land_cells[index])
+                for index in np.flatnonzero(self._occupied).tolist()]
 
     def place_animals(self, ini_animals):
         """
@@ -228,97 +537,124 @@ class Island:
             # Translating so that upper rightmost corner has coordinates 1,1, and not 0,0
             x -= 1
             y -= 1
-            self._cells[x, y].place_animals(dct.get('pop'))
+            index = int(np.ravel_multi_index((x, y), self.cells_dims))
+            self._select_streams(index)
+            self._cell(index).place_animals(dct.get('pop'))
+            self._update_counts(index)
 
     def grow_fodder(self):
         """
-        Calls the set_fodder method in all Cells that the Island consists of.
+        Calls the set_fodder method in all land Cells that the Island consists of.
+        Cells that are not created yet have full fodder already.
         """
 
-        rows, cols = self.cells_dims
-        for x in range(rows):
-            for y in range(cols):
-                self._cells[x, y].set_fodder()
+        for cell in self._land_cells.values():
+            cell.set_fodder()
 
     def feed_animals(self):
         """
-        Calls the animals_eat method in all Cells that the Island consists of.
+        Calls the animals_eat method in all occupied Cells that the Island consists of.
         """
 
-        rows, cols = self.cells_dims
-        for x in range(rows):
-            for y in range(cols):
-                self._cells[x, y].animals_eat()
+        for index in np.flatnonzero(self._occupied).tolist():
+            self._select_streams(index)
+            self._land_cells[index].animals_eat()
+            self._update_counts(index)
 
     def procreation(self):
         """
-        Calls the procreation method in all Cells that the Island consists of.
+        Calls the procreation method in all occupied Cells that the Island consists of.
         """
 
-        rows, cols = self.cells_dims
-        for x in range(rows):
-            for y in range(cols):
-                self._cells[x, y].procreation()
+        for index in np.flatnonzero(self._occupied).tolist():
+            self._select_streams(index)
+            self._land_cells[index].procreation()
+            self._update_counts(index)
 
     def aging(self):
         """
-        Calls the animals_age_by_one_year method in all Cells that the Island consists of.
+        Calls the animals_age_by_one_year method in all occupied Cells that the Island
+        consists of.
         """
 
-        rows, cols = self.cells_dims
-        for x in range(rows):
-            for y in range(cols):
-                self._cells[x, y].animals_age_by_one_year()
+        for _, cell in self.occupied_cells():
+            cell.animals_age_by_one_year()
 
     def death(self):
         """
-        Calls the animals_die method in all Cells that the Island consists of.
+        Calls the animals_die method in all occupied Cells that the Island consists of.
+        Cells where all animals died are removed from the occupied cells.
         """
 
-        rows, cols = self.cells_dims
-        for x in range(rows):
-            for y in range(cols):
-                self._cells[x, y].animals_die()
+        for index in np.flatnonzero(self._occupied).tolist():
+            self._select_streams(index)
+            self._land_cells[index].animals_die()
+            self._update_counts(index)
 
     def migration(self):
         """
         Handles migration on the Island. No animal can migrate to a Water cell.
-        Checks what animals will migrate, and to where.
+        First every occupied cell decides what animals will migrate, and to where, and then
+        the migrated animals are added to their new cells. Animals arriving in a cell are
+        added in the order of the cells they come from, so the animals in a cell are in the
+        same order however the island is split.
+        The counts and occupied cells are updated for the cells animals leave and arrive in.
+        """
+        self._move_departures(self._departures())
+
+    def _departures(self):
         """
+        Removes the migrating animals from all occupied cells.
+
+        Returns
+        -------
+        departures: list of tuples
+            flat index of the cell left, migration dictionary (see Cell.migrate) and flat
+            indices of its neighbours, in the order of the cells left
+        """
+        departures = []
+        for index in np.flatnonzero(self._occupied).tolist():
+            neighbours = self._neighbours[index].tolist()
+            adj_cells = [self._cell(adj_index) for adj_index in neighbours]
+            self._select_streams(index)
+            migration_dct = self._land_cells[index].migrate(adj_cells,
+                                                            self._habitable[neighbours])
+            if migration_dct:
+                departures.append((index, migration_dct, neighbours))
+                self._update_counts(index)
+        return departures
+
+    def _move_departures(self, departures):
+        """
+        Adds the migrated animals to their new cells.
 
-        rows, cols = self.cells_dims
-        for x in range(rows):
-            for y in range(cols):
-                if not type(self._cells[x, y]).__name__ == "Water":
-                    migration_dct = self._cells[x, y].migrate(self._adj_cells(x, y))
-                    self.move_migrated_animals(migration_dct, x, y)
+        Parameters
+        ----------
+        departures: list of tuples
+            see _departures
+        """
+        cols = self.cells_dims[1]
+        for index, migration_dct, neighbours in departures:
+            self.move_migrated_animals(migration_dct, *divmod(index, cols))
+            for adj_index in neighbours:
+                if self._land_cells.get(adj_index) in migration_dct:
+                    self._update_counts(adj_index)
 
     def move_migrated_animals(self, migration_dct, x, y):
         """
-        Moves the migrated animals by removing them from the current cell and adding to new cell.
+        Moves the migrated animals to their new cell. The animals have already been removed
+        from the current cell by Cell.migrate, and each batch is added to its destination at
+        once.
 
         Parameters
         ----------
         migration_dct: dict
-            of migrated animals and their new location cell
+            destination cell (keys) and tuple of migrated herbivores and carnivores (values)
         x: int
             current x-coordinate
         y: int
             current y-coordinate
         """
 
-        herbi_to_remove = []
-        carni_to_remove = []
-
-        for cell in migration_dct.keys():
-            if not type(cell).__name__ == "Water":
-                for animal in migration_dct[cell]:
-
-                    if type(animal).__name__ == "Herbivore":
-                        cell.herbivores_list.append(animal)
-                        herbi_to_remove.append(animal)
-                    else:
-                        cell.carnivores_list.append(animal)
-                        carni_to_remove.append(animal)
-
-        self._cells[x, y].remove_migrated_animals(herbi_to_remove, carni_to_remove)
+        for cell, (herbivores, carnivores) in migration_dct.items():
+            cell.add_migrated_animals(herbivores, carnivores)
@@ -0,0 +1,385 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compiled kernels for the phases of the annual cycle in a cell.
+
+The kernels are plain loops over NumPy arrays, compiled with Numba when it is installed.
+When the kernels are enabled with use_jit, the batch methods of Animal (hunt_array,
+graze_array, procreation_array, is_dying_array and migration_array) call them instead of
+their NumPy and Python code. The kernels use the same random numbers in the same order,
+so the results are the same. Without Numba the kernels are not enabled, and the batch
+methods keep their own code.
+"""
+
+__author__ = "Anja Stene, Student NMBU", "Ghazal Azadi, Student NMBU"
+__email__ = "anja.stene@nmbu.no", "ghazal.azadi@nmbu.no"
+
+import math
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+_jit = {'enabled': False}
+
+
+def available():
+    """
+    Checks if the kernels can be compiled.
+
+    Returns
+    -------
+    available: bool
+        True if Numba is installed
+    """
+    return numba is not None
+
+
+def use_jit(enabled=True):
+    """
+    Switches the compiled kernels on or off. The kernels are only switched on if Numba is
+    installed, otherwise the batch methods keep their own code.
+
+    Parameters
+    ----------
+    enabled: bool
+
+    Returns
+    -------
+    enabled: bool
+        True if the compiled kernels are used
+    """
+    _jit['enabled'] = bool(enabled) and available()
+    return _jit['enabled']
+
+
+def jit_enabled():
+    """
+    Checks if the compiled kernels are used.
+
+    Returns
+    -------
+    enabled: bool
+    """
+    return _jit['enabled']
+
+
+def _compile(function):
+    """
+    Compiles a kernel with Numba, if it is installed. The kernel is compiled the first
+    time it is called.
+
+    Parameters
+    ----------
+    function: function
+
+    Returns
+    -------
+    kernel: function
+    """
+    if numba is None:
+        return function
+    return numba.njit(cache=True)(function)
+
+
+def fitness_params(params):
+    """
+    Parameters of the fitness formula, in the order used by the kernels.
+
+    Parameters
+    ----------
+    params: dict
+        class dictionary "params" of the species
+
+    Returns
+    -------
+    params: np.ndarray
+        phi_age, a_half, phi_weight and w_half
+    """
+    return np.array([params['phi_age'], params['a_half'],
+                     params['phi_weight'], params['w_half']], dtype=float)
+
+
+def _fitness_py(age, weight, fitness_params):
+    """
+    Fitness of one animal, with the same formula as Animal._fitness_formula.
+    Fitness is zero where weight is zero.
+
+    Parameters
+    ----------
+    age: float
+    weight: float
+    fitness_params: np.ndarray
+        see fitness_params
+
+    Returns
+    -------
+    fitness: float
+    """
+    if weight == 0:
+        return 0.
+    exponent_age = fitness_params[0] * (age - fitness_params[1])
+    exponent_weight = -fitness_params[2] * (weight - fitness_params[3])
+    q1 = 0. if exponent_age > 700 else 1 / (1 + math.exp(exponent_age))
+    q2 = 0. if exponent_weight > 700 else 1 / (1 + math.exp(exponent_weight))
+    return q1 * q2
+
+
+_fitness = _compile(_fitness_py)
+
+
+def _next_alive_py(next_alive, position):
+    """
+    First prey at or after position that is not eaten yet, see Carnivore._next_alive.
+
+    Parameters
+    ----------
+    next_alive: np.ndarray of int
+    position: int
+
+    Returns
+    -------
+    position: int
+    """
+    alive = position
+    while next_alive[alive] != alive:
+        alive = next_alive[alive]
+    while next_alive[position] != alive:
+        following = next_alive[position]
+        next_alive[position] = alive
+        position = following
+    return alive
+
+
+_next_alive = _compile(_next_alive_py)
+
+
+def _hunt_py(hunter_order, age, weight, fitness, prey_fitness, prey_weight, next_alive,
+             eaten, uniforms, progress, appetite, hunt_params, fitness_params):
+    """
+    Hunt of the carnivores in a cell, see Carnivore.hunt_array. The hunt stops when the
+    random numbers given run out, and continues from progress when called again.
+
+    Parameters
+    ----------
+    hunter_order: np.ndarray of int
+    age: np.ndarray
+    weight: np.ndarray
+        weights of the carnivores, updated
+    fitness: np.ndarray
+        fitness of the carnivores, updated
+    prey_fitness: np.ndarray
+        fitness of the herbivores, from lowest to highest
+    prey_weight: np.ndarray
+        weights of the herbivores, in the same order
+    next_alive: np.ndarray of int
+        next prey not eaten, updated
+    eaten: np.ndarray of bool
+        True for every eaten herbivore, updated
+    uniforms: np.ndarray
+    progress: np.ndarray of int
+        position in hunter_order and position of the prey being hunted, -1 if the hunter
+        has not started, updated
+    appetite: np.ndarray
+        appetite left of the hunter, updated
+    hunt_params: np.ndarray
+        F, beta and DeltaPhiMax
+    fitness_params: np.ndarray
+
+    Returns
+    -------
+    used: int
+        number of random numbers used
+    """
+    f_max = hunt_params[0]
+    beta = hunt_params[1]
+    delta_phi_max = hunt_params[2]
+    num_prey = prey_fitness.shape[0]
+    used = 0
+    while progress[0] < hunter_order.shape[0]:
+        hunter = hunter_order[progress[0]]
+        if progress[1] < 0:
+            appetite[0] = f_max
+            progress[1] = _next_alive(next_alive, 0)
+        position = progress[1]
+
+        while position < num_prey:
+            fitness_difference = fitness[hunter] - prey_fitness[position]
+            if fitness_difference <= 0:
+                break
+            caught = True
+            if fitness_difference < delta_phi_max:
+                if used == uniforms.shape[0]:
+                    progress[1] = position
+                    return used
+                caught = uniforms[used] < fitness_difference / delta_phi_max
+                used += 1
+            if caught:
+                eaten[position] = True
+                next_alive[position] = position + 1
+                weight_to_eat = min(prey_weight[position], appetite[0])
+                appetite[0] -= weight_to_eat
+                weight[hunter] += beta * weight_to_eat
+                fitness[hunter] = _fitness(age[hunter], weight[hunter], fitness_params)
+
+            if appetite[0] == 0:
+                break
+            position = _next_alive(next_alive, position + 1)
+
+        progress[0] += 1
+        progress[1] = -1
+    return used
+
+
+_hunt = _compile(_hunt_py)
+
+
+def hunt(hunter_order, age, weight, fitness, prey_fitness, prey_weight, params, stream):
+    """
+    Hunt of the carnivores in a cell, see Carnivore.hunt_array. The random numbers are
+    looked at in blocks, and only the numbers used are taken from the stream.
+
+    Parameters
+    ----------
+    hunter_order: np.ndarray of int
+        carnivore indices from highest to lowest fitness
+    age: np.ndarray
+    weight: np.ndarray
+        weights of the carnivores, updated
+    fitness: np.ndarray
+        fitness of the carnivores, updated
+    prey_fitness: np.ndarray
+        fitness of the herbivores, from lowest to highest
+    prey_weight: np.ndarray
+        weights of the herbivores, in the same order
+    params: dict
+        class dictionary "params" of Carnivore
+    stream: RandomStream
+
+    Returns
+    -------
+    eaten: np.ndarray of bool
+        True for every eaten herbivore, in the order of prey_fitness
+    """
+    num_prey = prey_fitness.shape[0]
+    next_alive = np.arange(num_prey + 1)
+    eaten = np.zeros(num_prey, dtype=bool)
+    progress = np.array([0, -1])
+    appetite = np.zeros(1)
+    hunt_params = np.array([params['F'], params['beta'], params['DeltaPhiMax']], dtype=float)
+    age = np.asarray(age, dtype=float)
+    block = max(num_prey, 1)
+    while progress[0] < hunter_order.shape[0]:
+        used = _hunt(hunter_order, age, weight, fitness, prey_fitness, prey_weight, next_alive,
+                     eaten, stream.peek(block), progress, appetite, hunt_params,
+                     fitness_params(params))
+        stream.skip(used)
+        block *= 2
+    return eaten
+
+
+def _graze_py(num_animals, available_fodder, appetite):
+    """
+    Portions eaten by herbivores grazing one after another, see Herbivore.graze_array.
+    No portion is negative, also when there is no fodder left.
+
+    Parameters
+    ----------
+    num_animals: int
+    available_fodder: float
+    appetite: float
+
+    Returns
+    -------
+    portions: np.ndarray
+    available_fodder: float
+    """
+    portions = np.zeros(num_animals)
+    for index in range(num_animals):
+        portions[index] = max(0., min(appetite, available_fodder))
+        available_fodder -= portions[index]
+    if num_animals > 0:
+        available_fodder = max(available_fodder, 0.)
+    return portions, available_fodder
+
+
+graze = _compile(_graze_py)
+
+
+def _mating_py(weight, fitness, uniforms, min_weight, gamma):
+    """
+    Animals that give birth, before the weight of the newborn is checked,
+    see Animal.procreation_array.
+
+    Parameters
+    ----------
+    weight: np.ndarray
+    fitness: np.ndarray
+    uniforms: np.ndarray
+    min_weight: float
+        zeta (w_birth + sigma_birth)
+    gamma: float
+
+    Returns
+    -------
+    mothers: np.ndarray of bool
+    """
+    num_animals = weight.shape[0]
+    mothers = np.zeros(num_animals, dtype=np.bool_)
+    for index in range(num_animals):
+        prob = min(1., gamma * fitness[index] * (num_animals - 1))
+        mothers[index] = weight[index] > min_weight and uniforms[index] < prob
+    return mothers
+
+
+mating = _compile(_mating_py)
+
+
+def _dying_py(weight, fitness, uniforms, omega):
+    """
+    Animals that die, see Animal.is_dying_array.
+
+    Parameters
+    ----------
+    weight: np.ndarray
+    fitness: np.ndarray
+    uniforms: np.ndarray
+    omega: float
+
+    Returns
+    -------
+    dying: np.ndarray of bool
+    """
+    dying = np.zeros(weight.shape[0], dtype=np.bool_)
+    for index in range(weight.shape[0]):
+        dying[index] = weight[index] <= 0 or uniforms[index] < omega * (1 - fitness[index])
+    return dying
+
+
+dying = _compile(_dying_py)
+
+
+def _migrating_py(fitness, has_migrated, uniforms, mu):
+    """
+    Animals that migrate, see Animal.migration_array.
+
+    Parameters
+    ----------
+    fitness: np.ndarray
+    has_migrated: np.ndarray of bool
+    uniforms: np.ndarray
+    mu: float
+
+    Returns
+    -------
+    migrates: np.ndarray of bool
+    """
+    migrates = np.zeros(fitness.shape[0], dtype=np.bool_)
+    for index in range(fitness.shape[0]):
+        migrates[index] = not has_migrated[index] and uniforms[index] < mu * fitness[index]
+    return migrates
+
+
+migrating = _compile(_migrating_py)
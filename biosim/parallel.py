@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+
+__author__ = "Anja Stene, Student NMBU", "Ghazal Azadi, Student NMBU"
+__email__ = "anja.stene@nmbu.no", "ghazal.azadi@nmbu.no"
+
+from biosim.island import Island
+import multiprocessing
+import numpy as np
+
+
+class StripeIsland(Island):
+    """
+    Horizontal stripe of an Island, run by one worker process of ParallelIsland.
+    The stripe holds its own rows of the map plus one ghost row above and below where it
+    borders another stripe. Animals migrating into a ghost row are sent to the neighbouring
+    stripe instead, so the ghost rows are always empty.
+
+    The random streams of a cell are selected by its flat index on the whole island, so
+    every cell draws the same numbers as in the serial Island.
+    """
+
+    def __init__(self, island_map, ghost_above, ghost_below, backend='object',
+                 rng_mode='block', seed=None, row_offset=0):
+        """
+        Constructor for the stripe.
+
+        Parameters
+        ----------
+        island_map: string
+            rows of the stripe, including the ghost rows
+        ghost_above: bool
+            True if the first row is a ghost row
+        ghost_below: bool
+            True if the last row is a ghost row
+        backend: str
+        rng_mode: str
+        seed: int, optional
+        row_offset: int
+            row of the whole island that is the first row of the stripe
+        """
+        self.ghost_above = ghost_above
+        self.ghost_below = ghost_below
+        super().__init__(island_map, backend, rng_mode, seed)
+        self._index_offset = row_offset * self.cells_dims[1]
+        self._pending_departures = []
+
+    def _not_surrounded_by_ocean(self, map_array):
+        """
+        Raise an exception if a border cell of the stripe is not a Water Cell.
+        Ghost rows border another stripe and are not checked.
+
+        Parameters
+        ----------
+        map_array: np.ndarray
+        """
+        sides = [map_array[:, 0], map_array[:, -1]]
+        if not self.ghost_above:
+            sides.append(map_array[0, :])
+        if not self.ghost_below:
+            sides.append(map_array[-1, :])
+        for side in sides:
+            if not np.all(side == ord('W')):
+                raise ValueError('The given geography string is not valid.'
+                                 'The Island must be surrounded by Water')
+
+    def start_cycle(self):
+        """
+        First part of the annual cycle: the happenings inside the cells, and the departures
+        of the migrating animals. The departures within the stripe are kept until
+        finish_cycle, and the animals heading for a ghost row are returned.
+
+        Returns
+        -------
+        migrants: dict
+            'up' and 'down' (keys) and list of (column, herbivores, carnivores) (values)
+        """
+        self._cell_phases()
+        self._pending_departures = self._departures()
+
+        rows, cols = self.cells_dims
+        migrants = {'up': [], 'down': []}
+        for _, migration_dct, neighbours in self._pending_departures:
+            for side, adj_index in [('up', neighbours[0]), ('down', neighbours[1])]:
+                row, col = divmod(adj_index, cols)
+                ghost = self.ghost_above if side == 'up' else self.ghost_below
+                if ghost and row in (0, rows - 1):
+                    ghost_cell = self._land_cells.get(adj_index)
+                    if ghost_cell in migration_dct:
+                        migrants[side].append((col,) + migration_dct.pop(ghost_cell))
+        return migrants
+
+    def finish_cycle(self, arrivals):
+        """
+        Second part of the annual cycle: the migrated animals are added to their new cells,
+        together with the animals that arrived from the neighbouring stripes. All are added
+        in the order of the cells they left, as in Island.migration.
+
+        Parameters
+        ----------
+        arrivals: dict
+            'up' for animals from the stripe below, 'down' for animals from the stripe above
+            (keys), and list of (column, herbivores, carnivores) (values)
+        """
+        rows, cols = self.cells_dims
+        departures = list(self._pending_departures)
+        for side, migrants in arrivals.items():
+            # the cell left is in the ghost row next to the cell arrived in
+            row_left, row_arrived = (rows - 1, rows - 2) if side == 'up' else (0, 1)
+            for col, herbivores, carnivores in migrants:
+                arrived = row_arrived * cols + col
+                departures.append((row_left * cols + col,
+                                   {self._cell(arrived): (herbivores, carnivores)},
+                                   [arrived]))
+        departures.sort(key=lambda departure: departure[0])
+        self._move_departures(departures)
+        self._pending_departures = []
+        self._year += 1
+
+
+def _stripe_worker(connection, island_map, ghost_above, ghost_below, backend, rng_mode,
+                   seed, row_offset):
+    """
+    Worker process for one stripe. Carries out the commands sent from ParallelIsland
+    until 'close' is received.
+
+    Parameters
+    ----------
+    connection: multiprocessing.connection.Connection
+    island_map: string
+    ghost_above: bool
+    ghost_below: bool
+    backend: str
+    rng_mode: str
+    seed: int
+    row_offset: int
+    """
+    stripe = StripeIsland(island_map, ghost_above, ghost_below, backend, rng_mode, seed,
+                          row_offset)
+    while True:
+        command, argument = connection.recv()
+        if command == 'cycle':
+            connection.send(stripe.start_cycle())
+        elif command == 'arrive':
+            stripe.finish_cycle(argument)
+        elif command == 'place':
+            try:
+                stripe.place_animals(argument)
+                connection.send(None)
+            except ValueError as error:
+                connection.send(error)
+        elif command == 'count':
+            connection.send(stripe.total_num_animals_per_species(argument))
+        elif command == 'close':
+            break
+    connection.close()
+
+
+class ParallelIsland:
+    """
+    Island split into horizontal stripes of rows, each run by a persistent worker process.
+    The happenings inside the cells and the migration within a stripe are done by the
+    workers in parallel. During the migration, only the animals crossing the border between
+    two stripes are exchanged, through the main process.
+
+    The random streams of every cell are derived from the seed and the position of the
+    cell on the island (see RandomStream), so the results are the same as for the serial
+    Island with the same seed, for any number of workers.
+    """
+
+    def __init__(self, island_map, seed, num_workers=None, backend='object',
+                 rng_mode='block'):
+        """
+        Constructor for the class. Validates the map and starts the workers.
+        Raises ValueError if the map is not valid.
+
+        Parameters
+        ----------
+        island_map: string
+        seed: int
+        num_workers: int, optional
+            number of stripes and worker processes, the number of CPUs if not given
+        backend: str
+        rng_mode: str
+        """
+        Island(island_map, backend, rng_mode, seed)  # raises ValueError if the map is not valid
+        lines = island_map.replace(' ', '').splitlines()
+        if num_workers is None:
+            num_workers = multiprocessing.cpu_count()
+        num_workers = max(1, min(num_workers, len(lines)))
+
+        bounds = np.linspace(0, len(lines), num_workers + 1).astype(int)
+        self._stripe_rows = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+        self._connections = []
+        self._workers = []
+        for start, stop in self._stripe_rows:
+            ghost_above = start > 0
+            ghost_below = stop < len(lines)
+            stripe_map = '\n'.join(lines[start - ghost_above:stop + ghost_below])
+            connection, worker_connection = multiprocessing.Pipe()
+            worker = multiprocessing.Process(
+                target=_stripe_worker,
+                args=(worker_connection, stripe_map, ghost_above, ghost_below, backend,
+                      rng_mode, seed, start - ghost_above),
+                daemon=True)
+            worker.start()
+            self._connections.append(connection)
+            self._workers.append(worker)
+
+    @property
+    def num_workers(self):
+        """
+        Number of stripes and worker processes.
+        """
+        return len(self._workers)
+
+    def place_animals(self, ini_animals):
+        """
+        Places population of animals on Island in correct location, see Island.place_animals.
+        The upper left most cell has coordinates (1,1). ValueError raised by a worker is
+        raised again here.
+
+        Parameters
+        ----------
+        ini_animals: list of dicts
+        """
+        per_stripe = [[] for _ in self._stripe_rows]
+        for dct in ini_animals:
+            if dct.get('loc') is None:
+                raise ValueError('Location of animal to place was not given')
+            x, y = dct.get('loc')
+            for stripe, (start, stop) in enumerate(self._stripe_rows):
+                if start < x <= stop:
+                    # coordinates within the stripe, where the ghost row above is row 1
+                    local_x = x - start + (start > 0)
+                    per_stripe[stripe].append({'loc': (local_x, y), 'pop': dct.get('pop')})
+                    break
+            else:
+                raise ValueError('Location ' + str((x, y)) + ' is not on the Island')
+
+        for connection, stripe_animals in zip(self._connections, per_stripe):
+            if stripe_animals:
+                connection.send(('place', stripe_animals))
+                error = connection.recv()
+                if error is not None:
+                    raise error
+
+    def annual_cycle(self):
+        """
+        Annual cycle of happenings on the Island. All workers run the annual cycle of their
+        stripe at the same time, and the animals that migrated into a ghost row are sent on
+        to the neighbouring stripe before the workers finish the migration.
+        """
+        for connection in self._connections:
+            connection.send(('cycle', None))
+        migrants = [connection.recv() for connection in self._connections]
+
+        for stripe, connection in enumerate(self._connections):
+            arrivals = {}
+            if stripe + 1 < self.num_workers:
+                arrivals['up'] = migrants[stripe + 1]['up']
+            if stripe > 0:
+                arrivals['down'] = migrants[stripe - 1]['down']
+            connection.send(('arrive', arrivals))
+
+    def num_animals_per_stripe(self, species):
+        """
+        Number of animals of a species in each stripe.
+
+        Parameters
+        ----------
+        species: str
+
+        Returns
+        -------
+        num_animals: list of int
+        """
+        for connection in self._connections:
+            connection.send(('count', species))
+        return [connection.recv() for connection in self._connections]
+
+    def total_num_animals_per_species(self, species):
+        """
+        Calculates total number of animals per kind on Island.
+
+        Parameters
+        ----------
+        species: str
+
+        Returns
+        -------
+        num_animals: int
+        """
+        return sum(self.num_animals_per_stripe(species))
+
+    def close(self):
+        """
+        Stops the worker processes.
+        """
+        for connection, worker in zip(self._connections, self._workers):
+            if worker.is_alive():
+                connection.send(('close', None))
+            worker.join()
+            connection.close()
+        self._connections = []
+        self._workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
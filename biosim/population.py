@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+
+__author__ = "Anja Stene, Student NMBU", "Ghazal Azadi, Student NMBU"
+__email__ = "anja.stene@nmbu.no", "ghazal.azadi@nmbu.no"
+
+import numpy as np
+
+
+class Population:
+    """
+    Columnar store for all animals of one species in one cell.
+    Instead of one Animal object per animal, the population keeps NumPy arrays of age,
+    weight, cached fitness and the has_migrated flag, with one entry per animal.
+    The annual happenings are carried out as array operations on the whole population.
+    Parameters are read from the species class, so set_given_parameters applies here too.
+    The cached fitness is calculated again before it is used if the parameters have been
+    set since it was calculated, as for Animal objects.
+    """
+
+    def __init__(self, species):
+        """
+        Constructor for the class, the population starts off empty.
+
+        Parameters
+        ----------
+        species: class
+            Animal subclass (Herbivore or Carnivore) of the animals in the population
+        """
+        self.species = species
+        self.age = np.zeros(0, dtype=int)
+        self.weight = np.zeros(0)
+        self.fitness = np.zeros(0)
+        self.has_migrated = np.zeros(0, dtype=bool)
+        # parameter generation the cached fitness was calculated with, see Animal
+        self._fitness_generation = species._params_generation
+
+    def __len__(self):
+        """
+        Number of animals in the population
+        """
+        return self.age.shape[0]
+
+    @property
+    def params(self):
+        """
+        Parameter dictionary of the species class
+        """
+        return self.species.params
+
+    def place_animals(self, animals, stream=None):
+        """
+        Adds animals given by age and weight to the population.
+        Missing values are set in the same way as by the Animal constructor:
+        age 0, and weight drawn from the initial_weight method.
+        Specifying invalid age or weight values will raise a value error.
+
+        Parameters
+        ----------
+        animals: list of tuples
+            (age, weight) for every animal to be placed, any of them may be None
+        stream: RandomStream, optional
+            source of the initial weights, see Animal.initial_weight
+        """
+        ages = []
+        weights = []
+        for age, weight in animals:
+            if age is None:
+                age = 0
+            else:
+                self.species.raise_non_valid_attribute('Age', age)
+
+            if weight is None:
+                weight = self.species.initial_weight(stream)
+            else:
+                self.species.raise_non_valid_attribute('Weight', weight)
+            ages.append(age)
+            weights.append(weight)
+
+        self.extend(np.array(ages, dtype=int), np.array(weights, dtype=float))
+
+    def extend(self, age, weight, has_migrated=None, fitness=None):
+        """
+        Appends animals to the end of the population.
+        Fitness is calculated for the new animals if it is not given.
+
+        Parameters
+        ----------
+        age: np.ndarray
+        weight: np.ndarray
+        has_migrated: np.ndarray of bool, all False if not given
+        fitness: np.ndarray
+        """
+        if len(age) == 0:
+            return
+        self.refresh_fitness()
+        if has_migrated is None:
+            has_migrated = np.zeros(len(age), dtype=bool)
+        if fitness is None:
+            fitness = self.compute_fitness(age, weight)
+
+        self.age = np.concatenate((self.age, age))
+        self.weight = np.concatenate((self.weight, weight))
+        self.fitness = np.concatenate((self.fitness, fitness))
+        self.has_migrated = np.concatenate((self.has_migrated, has_migrated))
+
+    def add_population(self, other):
+        """
+        Appends all animals of another population of the same species.
+
+        Parameters
+        ----------
+        other: Population
+        """
+        other.refresh_fitness()
+        self.extend(other.age, other.weight, other.has_migrated, other.fitness)
+
+    def keep(self, mask):
+        """
+        Compacts the population, keeping only the animals where mask is True.
+
+        Parameters
+        ----------
+        mask: np.ndarray of bool
+        """
+        self.age = self.age[mask]
+        self.weight = self.weight[mask]
+        self.fitness = self.fitness[mask]
+        self.has_migrated = self.has_migrated[mask]
+
+    def compute_fitness(self, age, weight):
+        """
+        Calculates fitness for arrays of ages and weights with calculate_fitness_array
+        of the species. If weight is zero, fitness is zero.
+
+        Parameters
+        ----------
+        age: np.ndarray
+        weight: np.ndarray
+
+        Returns
+        -------
+        fitness: np.ndarray
+        """
+        return self.species.calculate_fitness_array(age, weight)
+
+    def update_fitness(self, index=None):
+        """
+        Recalculates the cached fitness, for all animals or for the given indices only.
+
+        Parameters
+        ----------
+        index: np.ndarray of int, optional
+        """
+        if index is None:
+            self.fitness = self.compute_fitness(self.age, self.weight)
+            self._fitness_generation = self.species._params_generation
+        else:
+            self.fitness[index] = self.compute_fitness(self.age[index], self.weight[index])
+
+    def refresh_fitness(self):
+        """
+        Recalculates the cached fitness of all animals if the parameters have been set since
+        it was calculated.
+        """
+        if self._fitness_generation != self.species._params_generation:
+            self.update_fitness()
+
+    def grow_older(self):
+        """
+        All animals grow one year older: age is increased by 1, weight decreases by the
+        annual weight loss and the has_migrated flag is reset.
+        """
+        self.age += 1
+        self.weight -= self.params['eta'] * self.weight
+        self.has_migrated[:] = False
+        self.update_fitness()
+
+    def die(self, stream):
+        """
+        Removes the dead animals. Animals with zero weight always die, the others die with
+        probability p = omega (1 - fitness).
+
+        Parameters
+        ----------
+        stream: RandomStream
+        """
+        self.refresh_fitness()
+        self.keep(~self.species.is_dying_array(self.weight, self.fitness, stream))
+
+    def procreate(self, stream):
+        """
+        Every animal in the population tries to give birth once, under the same conditions as
+        Animal.create_newborn. The newborns are added to the population after all animals have
+        tried to procreate.
+
+        Parameters
+        ----------
+        stream: RandomStream
+        """
+        self.refresh_fitness()
+        mothers, newborn_weight = self.species.procreation_array(self.weight, self.fitness,
+                                                                 stream)
+        self.weight[mothers] -= self.params['xi'] * newborn_weight
+        self.update_fitness(mothers)
+        self.extend(np.zeros(mothers.shape[0], dtype=int), newborn_weight)
+
+    def graze(self, available_fodder, stream):
+        """
+        Herbivores eat in random order, each eating its appetite F as long as there is fodder
+        available, computed by Herbivore.graze_array. The weight of all herbivores is updated
+        by beta times the amount eaten in one array operation. The population is left in the
+        order the herbivores ate in, as on the object backend.
+
+        Parameters
+        ----------
+        available_fodder: float
+        stream: RandomStream
+
+        Returns
+        -------
+        available_fodder: float
+            fodder left in cell after grazing
+        """
+        order, portions, available_fodder = self.species.graze_array(len(self),
+                                                                     available_fodder, stream)
+        self.keep(order)
+        self.weight += self.params['beta'] * portions
+        self.update_fitness(np.flatnonzero(portions))
+        return available_fodder
+
+    def hunt(self, prey, stream):
+        """
+        Carnivores prey on the given herbivore population with Carnivore.hunt_array.
+        Herbivores are eaten in the order of lowest to highest fitness, and the carnivores
+        hunt in the order of highest to lowest fitness. A carnivore never eats more than its
+        appetite F. The eaten herbivores are removed from prey in one compaction after the
+        hunt, and both populations are left in the order they were handled in, as on the
+        object backend.
+
+        Parameters
+        ----------
+        prey: Population
+            herbivores in the same cell
+        stream: RandomStream
+        """
+        self.refresh_fitness()
+        prey.refresh_fitness()
+        prey_order, hunter_order, eaten, self.weight, self.fitness = self.species.hunt_array(
+            self.age, self.weight, self.fitness, prey.weight, prey.fitness, stream)
+        prey.keep(prey_order[~eaten[prey_order]])
+        self.keep(hunter_order)
+
+    def migration_directions(self, stream):
+        """
+        Checks which animals migrate and where to.
+        Animals that already migrated this year stay.
+        Probability of migration is p = mu * fitness, the direction is chosen at random among
+        the four neighbouring cells. Migrating animals get their has_migrated flag set.
+
+        Parameters
+        ----------
+        stream: RandomStream
+
+        Returns
+        -------
+        directions: np.ndarray of int
+            index 0-3 of the neighbouring cell to migrate to, -1 for animals that stay
+        """
+        self.refresh_fitness()
+        directions = self.species.migration_array(self.fitness, self.has_migrated, stream)
+        self.has_migrated |= directions >= 0
+        return directions
+
+    def split(self, destinations, num_destinations):
+        """
+        Partitions the population by destination in a single pass. Animals with destination
+        -1 stay in this population, the others are moved to one new population per
+        destination.
+
+        Parameters
+        ----------
+        destinations: np.ndarray of int
+            destination index of every animal, -1 for animals that stay
+        num_destinations: int
+
+        Returns
+        -------
+        moved: list of Population
+            one population (possibly empty) for each destination index
+        """
+        self.refresh_fitness()
+        groups = partition(destinations, num_destinations)
+        moved = []
+        for index in groups[1:]:
+            group = Population(self.species)
+            group.extend(self.age[index], self.weight[index],
+                         self.has_migrated[index], self.fitness[index])
+            moved.append(group)
+        self.keep(groups[0])
+        return moved
+
+
+def partition(destinations, num_destinations):
+    """
+    Groups the indices of animals by destination with one stable sort, keeping the order of
+    the animals within each group.
+
+    Parameters
+    ----------
+    destinations: np.ndarray of int
+        destination index of every animal, -1 for animals that stay
+    num_destinations: int
+
+    Returns
+    -------
+    groups: list of np.ndarray of int
+        indices of the animals that stay, followed by the indices for each destination
+    """
+    order = np.argsort(destinations, kind='stable')
+    counts = np.bincount(destinations + 1, minlength=num_destinations + 1)
+    return np.split(order, np.cumsum(counts)[:-1])
@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+
+__author__ = "Anja Stene, Student NMBU", "Ghazal Azadi, Student NMBU"
+__email__ = "anja.stene@nmbu.no", "ghazal.azadi@nmbu.no"
+
+import numpy as np
+
+PHASES = ('feeding', 'procreation', 'death', 'migration', 'placement')
+
+
+class RandomStream:
+    """
+    Stream of random numbers used for the random decisions in one phase of the annual cycle
+    (birth, death, migration, predation and grazing order).
+
+    The numbers come from a counter-based Philox generator owned by the stream. The key of
+    the generator is derived from the seed of the simulation, and select sets the counter
+    to (year, phase, cell). Every cell therefore draws from its own independent stream in
+    every phase and year, and the numbers a cell gets do not depend on the order the cells
+    are visited in, on the backend, or on which process runs the cell.
+
+    All numbers, also the normal numbers and permutations, are made from the uniform
+    numbers of the stream, so the position in the stream of a cell is the number of uniform
+    numbers used. The position of every cell used in the current year is kept, and a cell
+    selected again continues where it was, however many other cells were selected between.
+
+    In 'block' mode the uniform numbers are drawn in blocks, sized to the population of
+    the cell by calling prepare before a phase, and decisions are served from that buffer.
+    This avoids one NumPy call per decision.
+
+    In 'exact' mode every number is drawn from the generator at the moment it is needed,
+    except for numbers looked at in advance with peek.
+    """
+    modes = ('block', 'exact')
+
+    def __init__(self, mode='block', min_block=64, seed=None, phase=0):
+        """
+        Constructor for the class, the buffer starts off empty and the stream is selected
+        for year 0 and cell 0.
+        Raises value error if mode is not known.
+
+        Parameters
+        ----------
+        mode: str
+            'block' or 'exact'
+        min_block: int
+            smallest number of variates drawn at once in block mode
+        seed: int, optional
+            seed of the simulation, drawn from np.random if not given
+        phase: int
+            index of the phase in PHASES
+        """
+        if mode not in self.modes:
+            raise ValueError('Unknown random stream mode, ' + str(mode) +
+                             ', must be one of ' + str(self.modes))
+        self.mode = mode
+        self._exact = mode == 'exact'
+        self._min_block = min_block
+        if seed is None:
+            seed = np.random.randint(2**32)
+        self._key = np.random.SeedSequence(seed).generate_state(2, np.uint64)
+        self._phase = phase
+        self._bit_generator = np.random.Philox(key=self._key)
+        self._generator = np.random.Generator(self._bit_generator)
+        self._selected = None
+        self._reset_pending = False
+        self._position = 0
+        # positions of the cells left in the selected year, see select
+        self._positions = {}
+        self.select(0, 0)
+
+    def select(self, year, cell):
+        """
+        Selects the stream of a cell in a year. The generator is only reset when the first
+        number is drawn, and selecting the stream that is already selected does nothing, so
+        the stream continues where it was. A cell selected again in the same year continues
+        from the position it was left at.
+
+        Parameters
+        ----------
+        year: int
+        cell: int
+            flat index of the cell on the island
+        """
+        if self._selected == (year, cell):
+            return
+        if self._selected is not None and self._selected[0] == year:
+            if self._position > 0:
+                self._positions[self._selected[1]] = self._position
+        else:
+            self._positions = {}
+        self._selected = year, cell
+        self._position = self._positions.pop(cell, 0)
+        self._reset_pending = True
+        self._buffer = np.zeros(0)
+        self._pos = 0
+
+    def _generator_of_cell(self):
+        """
+        Generator positioned in the stream of the selected cell, after the numbers used.
+
+        Returns
+        -------
+        generator: np.random.Generator
+        """
+        if self._reset_pending:
+            year, cell = self._selected
+            self._bit_generator.state = {
+                'bit_generator': 'Philox',
+                'state': {'counter': np.array([0, year, self._phase, cell], dtype=np.uint64),
+                          'key': self._key},
+                'buffer': np.zeros(4, dtype=np.uint64),
+                'buffer_pos': 4,
+                'has_uint32': 0,
+                'uinteger': 0}
+            # every uniform number uses one 64 bit value, four values per counter step
+            self._bit_generator.advance(self._position // 4)
+            self._bit_generator.random_raw(self._position % 4)
+            self._reset_pending = False
+        return self._generator
+
+    def _draw(self, num_variates):
+        """
+        Draws a block of uniform random numbers.
+
+        Parameters
+        ----------
+        num_variates: int
+
+        Returns
+        -------
+        block: np.ndarray
+        """
+        return self._generator_of_cell().random(num_variates)
+
+    def prepare(self, num_variates):
+        """
+        Makes sure at least num_variates numbers are in the buffer. Numbers left in the buffer
+        are kept and served first. Does nothing in exact mode.
+
+        Parameters
+        ----------
+        num_variates: int
+        """
+        if not self._exact:
+            self._fill(num_variates)
+
+    def _fill(self, num_variates):
+        """
+        Draws numbers into the buffer until at least num_variates are available.
+
+        Parameters
+        ----------
+        num_variates: int
+        """
+        available = self._buffer.shape[0] - self._pos
+        if available >= num_variates:
+            return
+        block = self._draw(max(num_variates - available, self._min_block))
+        self._buffer = np.concatenate((self._buffer[self._pos:], block))
+        self._pos = 0
+
+    def random(self):
+        """
+        Next uniform random number.
+
+        Returns
+        -------
+        number: float
+        """
+        if self._exact and self._pos >= self._buffer.shape[0]:
+            number = self._generator_of_cell().random()
+            self._position += 1
+            return number
+        if self._pos >= self._buffer.shape[0]:
+            self.prepare(1)
+        number = self._buffer[self._pos]
+        self._pos += 1
+        self._position += 1
+        return number
+
+    def random_array(self, num_variates):
+        """
+        Next num_variates uniform random numbers.
+
+        Parameters
+        ----------
+        num_variates: int
+
+        Returns
+        -------
+        numbers: np.ndarray
+        """
+        if self._exact and self._pos >= self._buffer.shape[0]:
+            numbers = self._generator_of_cell().random(num_variates)
+            self._position += num_variates
+            return numbers
+        numbers = self.peek(num_variates)
+        self.skip(num_variates)
+        return numbers
+
+    def peek(self, num_variates):
+        """
+        Next num_variates uniform random numbers, without using them. They are served again
+        by the following draws, unless skipped with skip. In exact mode the numbers are
+        drawn into the buffer, which is served before the generator.
+
+        Parameters
+        ----------
+        num_variates: int
+
+        Returns
+        -------
+        numbers: np.ndarray
+        """
+        self._fill(num_variates)
+        return self._buffer[self._pos:self._pos + num_variates]
+
+    def skip(self, num_variates):
+        """
+        Uses the next num_variates numbers returned by peek.
+
+        Parameters
+        ----------
+        num_variates: int
+        """
+        self._pos += num_variates
+        self._position += num_variates
+
+    def direction(self):
+        """
+        Random choice of one of the four neighbouring cells.
+
+        Returns
+        -------
+        direction: int
+            0, 1, 2 or 3
+        """
+        return int(self.random() * 4)
+
+    def directions(self, num_variates):
+        """
+        Random choices of one of the four neighbouring cells, for several animals.
+
+        Parameters
+        ----------
+        num_variates: int
+
+        Returns
+        -------
+        directions: np.ndarray of int
+        """
+        return (self.random_array(num_variates) * 4).astype(int)
+
+    def permutation(self, num_variates):
+        """
+        Random permutation, the order of num_variates uniform numbers.
+
+        Parameters
+        ----------
+        num_variates: int
+
+        Returns
+        -------
+        permutation: np.ndarray of int
+        """
+        return np.argsort(self.random_array(num_variates), kind='stable')
+
+    def normal(self, loc, scale, size=None):
+        """
+        Normally distributed random numbers, made from two uniform numbers each with the
+        Box-Muller transform.
+
+        Parameters
+        ----------
+        loc: float
+        scale: float
+        size: int, optional
+
+        Returns
+        -------
+        numbers: float or np.ndarray
+        """
+        uniforms = self.random_array(2 * (1 if size is None else size))
+        half = uniforms.shape[0] // 2
+        normal = np.sqrt(-2 * np.log(1 - uniforms[:half])) * np.cos(2 * np.pi * uniforms[half:])
+        if size is None:
+            return loc + scale * float(normal[0])
+        return loc + scale * normal
+
+
+def phase_streams(mode='block', seed=None):
+    """
+    Creates one random stream for each phase of the annual cycle.
+
+    Parameters
+    ----------
+    mode: str
+        'block' or 'exact', see RandomStream
+    seed: int, optional
+        seed of the simulation, drawn from np.random if not given
+
+    Returns
+    -------
+    streams: dict
+        phase name (keys) and RandomStream (values)
+    """
+    if seed is None:
+        seed = np.random.randint(2**32)
+    return {phase: RandomStream(mode, seed=seed, phase=index)
+            for index, phase in enumerate(PHASES)}
+
+
+def select_cell(streams, year, cell):
+    """
+    Selects the streams of a cell in a year, for all phases.
+
+    Parameters
+    ----------
+    streams: dict
+        phase name (keys) and RandomStream (values)
+    year: int
+    cell: int
+        flat index of the cell on the island
+    """
+    for stream in streams.values():
+        stream.select(year, cell)
@@ -0,0 +1,415 @@
+# -*- coding: utf-8 -*-
+
+__author__ = "Anja Stene, Student NMBU", "Ghazal Azadi, Student NMBU"
+__email__ = "anja.stene@nmbu.no", "ghazal.azadi@nmbu.no"
+
+import json
+import os
+import numpy as np
+
+_HEADER_NAME = 'header.json'
+
+
+class Recorder:
+    """
+    Streams the state of a simulation to a recording, one row per year.
+
+    A recording is a directory with one binary file per column and a header describing the
+    columns. The rows of a column are written back to back as raw values, so a column is
+    appended to without rewriting the file, and read back with one call to np.fromfile.
+    Rows are kept in memory until flush_years rows are collected, and are then appended to
+    the files.
+
+    The columns are
+    'year': the year after the annual cycle,
+    'totals': number of animals of each species,
+    'density': number of animals of each species in every cell, shape (species, rows, cols),
+    and with summaries, for age, weight and fitness, '<property>_mean' and '<property>_std'
+    of each species (NaN if there are no animals of the species).
+    """
+    summary_properties = ('age', 'weight', 'fitness')
+
+    def __init__(self, path, species, map_dims, summaries=False, densities=True,
+                 flush_years=100, mode='w'):
+        """
+        Constructor for the class. Creates the recording, or opens it for appending.
+        Raises ValueError if the mode is not known, or if the recording appended to has other
+        columns.
+
+        Parameters
+        ----------
+        path: str
+            directory of the recording
+        species: list of str
+        map_dims: tuple of int
+            rows and columns of the island
+        summaries: bool
+            True to record summaries of age, weight and fitness
+        densities: bool
+            True to record the number of animals in every cell
+        flush_years: int
+            number of rows kept in memory before they are written
+        mode: str
+            'w' to start a new recording, 'a' to append to an existing recording
+        """
+        if mode not in ('w', 'a'):
+            raise ValueError('Unknown mode, ' + str(mode) + ', must be \'w\' or \'a\'')
+        self.path = path
+        self.species = list(species)
+        self.flush_years = flush_years
+
+        num_species = len(self.species)
+        columns = {'year': ('int64', ()), 'totals': ('int64', (num_species,))}
+        if densities:
+            columns['density'] = ('int32', (num_species,) + tuple(map_dims))
+        if summaries:
+            for name in self.summary_properties:
+                columns[name + '_mean'] = ('float64', (num_species,))
+                columns[name + '_std'] = ('float64', (num_species,))
+        self._header = {'species': self.species,
+                        'map_dims': list(map_dims),
+                        'columns': {name: {'dtype': dtype, 'shape': list(shape)}
+                                    for name, (dtype, shape) in columns.items()}}
+
+        if mode == 'a' and os.path.exists(os.path.join(path, _HEADER_NAME)):
+            if read_header(path) != self._header:
+                raise ValueError('The recording in ' + str(path) +
+                                 ' does not have the same columns')
+        else:
+            os.makedirs(path, exist_ok=True)
+            with open(os.path.join(path, _HEADER_NAME), 'w') as header_file:
+                json.dump(self._header, header_file, indent=1)
+            for name in columns:
+                open(_column_file(path, name), 'wb').close()
+        self._rows = {name: [] for name in columns}
+
+    def record(self, year, island):
+        """
+        Adds the state of the island as one row, and writes the rows to file when
+        flush_years rows are collected.
+
+        Parameters
+        ----------
+        year: int
+        island: Island
+        """
+        rows = self._rows
+        rows['year'].append(year)
+        rows['totals'].append([island.total_num_animals_per_species(species)
+                               for species in self.species])
+        if 'density' in rows:
+            rows['density'].append(np.array([island.animal_count_grid(species)
+                                             for species in self.species]))
+        if 'age_mean' in rows:
+            properties = [island.animal_properties(species) for species in self.species]
+            for name in self.summary_properties:
+                values = [species_properties[name] for species_properties in properties]
+                rows[name + '_mean'].append([np.mean(value) if value.size else np.nan
+                                             for value in values])
+                rows[name + '_std'].append([np.std(value) if value.size else np.nan
+                                            for value in values])
+
+        if len(rows['year']) >= self.flush_years:
+            self.flush()
+
+    def truncate(self, year):
+        """
+        Drops the rows of year and the years after it, so the recording continues from the
+        year before, as when a simulation is resumed from a checkpoint. Rows written to
+        only some of the columns are dropped as well.
+
+        Parameters
+        ----------
+        year: int
+            first year to drop
+        """
+        self.flush()
+        years = read_record(self.path)['year']
+        num_years = int(np.count_nonzero(years < year))
+        for name, column in self._header['columns'].items():
+            row_size = int(np.prod(column['shape'])) * np.dtype(column['dtype']).itemsize
+            with open(_column_file(self.path, name), 'r+b') as column_file:
+                column_file.truncate(num_years * row_size)
+
+    def flush(self):
+        """
+        Appends the rows kept in memory to the files.
+        """
+        for name, rows in self._rows.items():
+            if rows:
+                dtype = self._header['columns'][name]['dtype']
+                with open(_column_file(self.path, name), 'ab') as column_file:
+                    np.asarray(rows, dtype=dtype).tofile(column_file)
+                rows.clear()
+
+    def close(self):
+        """
+        Writes the rows kept in memory. The recording can be appended to later with mode 'a'.
+        """
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _column_file(path, name):
+    """
+    File of a column in a recording.
+
+    Parameters
+    ----------
+    path: str
+    name: str
+
+    Returns
+    -------
+    file_name: str
+    """
+    return os.path.join(path, name + '.bin')
+
+
+def read_header(path):
+    """
+    Reads the header of a recording.
+
+    Parameters
+    ----------
+    path: str
+        directory of the recording
+
+    Returns
+    -------
+    header: dict
+        'species', 'map_dims' and 'columns' (keys), see Recorder
+    """
+    with open(os.path.join(path, _HEADER_NAME)) as header_file:
+        return json.load(header_file)
+
+
+def read_record(path):
+    """
+    Reads all columns of a recording as NumPy arrays with one row per year. Only rows that
+    are written to all columns are returned.
+
+    Parameters
+    ----------
+    path: str
+        directory of the recording
+
+    Returns
+    -------
+    columns: dict
+        column name (keys) and np.ndarray (values)
+    """
+    columns = {}
+    for name, column in read_header(path)['columns'].items():
+        values = np.fromfile(_column_file(path, name), dtype=column['dtype'])
+        columns[name] = values.reshape((-1,) + tuple(column['shape']))
+    num_years = min(len(values) for values in columns.values())
+    return {name: values[:num_years] for name, values in columns.items()}
+
+
+class DensityHistory:
+    """
+    Number of animals of each species in every cell for every year, kept in a memory-mapped
+    array on disk with shape (years, rows, cols, species).
+
+    The history is a directory with the raw array (density_history.bin) and a header
+    (density_history.json) with the species, the map dimensions, the first year and the
+    number of years written. Space for more years is allocated by reserve, which
+    simulate calls with the number of years to simulate, so the file grows across
+    repeated simulations. Only the grids of the year being written are in memory.
+    """
+
+    def __init__(self, path, species, map_dims, mode='w'):
+        """
+        Constructor for the class. Creates the history, or opens it to continue it.
+        Raises ValueError if the mode is not known, or if the history continued has other
+        species or map dimensions.
+
+        Parameters
+        ----------
+        path: str
+            directory of the history
+        species: list of str
+        map_dims: tuple of int
+            rows and columns of the island
+        mode: str
+            'w' to start a new history, 'a' to continue an existing history
+        """
+        if mode not in ('w', 'a'):
+            raise ValueError('Unknown mode, ' + str(mode) + ', must be \'w\' or \'a\'')
+        self.path = path
+        self.species = list(species)
+        self.map_dims = tuple(map_dims)
+        self._grid_shape = self.map_dims + (len(self.species),)
+        self._grids = None
+
+        if mode == 'a' and os.path.exists(_history_file(path, 'json')):
+            header = read_density_header(path)
+            if header['species'] != self.species or tuple(header['map_dims']) != self.map_dims:
+                raise ValueError('The density history in ' + str(path) +
+                                 ' does not have the same species and map')
+            self.first_year = header['first_year']
+            self.num_years = header['num_years']
+            self.capacity = header['capacity']
+            self._map_grids()
+        else:
+            os.makedirs(path, exist_ok=True)
+            open(_history_file(path, 'bin'), 'wb').close()
+            self.first_year = None
+            self.num_years = 0
+            self.capacity = 0
+            self._write_header()
+
+    def _map_grids(self):
+        """
+        Maps the allocated years of the file to memory.
+        """
+        self._grids = None
+        if self.capacity > 0:
+            self._grids = np.memmap(_history_file(self.path, 'bin'), dtype=np.int32,
+                                    mode='r+', shape=(self.capacity,) + self._grid_shape)
+
+    def reserve(self, num_years):
+        """
+        Makes sure the file has space for num_years more years after the years written.
+
+        Parameters
+        ----------
+        num_years: int
+        """
+        capacity = self.num_years + num_years
+        if capacity <= self.capacity:
+            return
+        if self._grids is not None:
+            self._grids.flush()
+        with open(_history_file(self.path, 'bin'), 'r+b') as history_file:
+            history_file.truncate(capacity * int(np.prod(self._grid_shape)) *
+                                  np.dtype(np.int32).itemsize)
+        self.capacity = capacity
+        self._map_grids()
+
+    def record(self, year, island):
+        """
+        Writes the grids of the island for a year. The year must follow the years written,
+        or be one of them, which is then written again together with the years after it
+        discarded, as when a simulation is resumed from a checkpoint.
+        Raises ValueError if there is a gap between the years written and year.
+
+        Parameters
+        ----------
+        year: int
+        island: Island
+        """
+        if self.first_year is None:
+            self.first_year = year
+        index = year - self.first_year
+        if not 0 <= index <= self.num_years:
+            raise ValueError('Year ' + str(year) + ' does not follow the years ' +
+                             str(self.first_year) + ' to ' +
+                             str(self.first_year + self.num_years - 1))
+        if index == self.capacity:
+            self.reserve(max(self.capacity, 1))
+        for row, species in enumerate(self.species):
+            self._grids[index, :, :, row] = island.animal_count_grid(species)
+        self.num_years = index + 1
+
+    def _write_header(self):
+        """
+        Writes the header of the history.
+        """
+        header = {'species': self.species, 'map_dims': list(self.map_dims),
+                  'first_year': self.first_year, 'num_years': self.num_years,
+                  'capacity': self.capacity}
+        with open(_history_file(self.path, 'json'), 'w') as header_file:
+            json.dump(header, header_file, indent=1)
+
+    def flush(self):
+        """
+        Writes the grids in memory to disk, and the number of years to the header.
+        """
+        if self._grids is not None:
+            self._grids.flush()
+        self._write_header()
+
+    def close(self):
+        """
+        Flushes the history and unmaps the file.
+        """
+        self.flush()
+        self._grids = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _history_file(path, extension):
+    """
+    File of a density history.
+
+    Parameters
+    ----------
+    path: str
+    extension: str
+        'bin' for the array, 'json' for the header
+
+    Returns
+    -------
+    file_name: str
+    """
+    return os.path.join(path, 'density_history.' + extension)
+
+
+def read_density_header(path):
+    """
+    Reads the header of a density history.
+
+    Parameters
+    ----------
+    path: str
+        directory of the history
+
+    Returns
+    -------
+    header: dict
+        'species', 'map_dims', 'first_year', 'num_years' and 'capacity' (keys)
+    """
+    with open(_history_file(path, 'json')) as header_file:
+        return json.load(header_file)
+
+
+def read_density_history(path):
+    """
+    Opens a density history for reading, without loading it. Slices of the returned array
+    are read from disk when they are used.
+
+    Parameters
+    ----------
+    path: str
+        directory of the history
+
+    Returns
+    -------
+    years: np.ndarray of int
+        year of every grid
+    grids: np.memmap
+        read-only array with shape (years, rows, cols, species), species in the order of
+        the header
+    """
+    header = read_density_header(path)
+    num_years = header['num_years']
+    first_year = header['first_year'] or 0
+    years = np.arange(first_year, first_year + num_years)
+    grid_shape = tuple(header['map_dims']) + (len(header['species']),)
+    if num_years == 0:
+        return years, np.zeros((0,) + grid_shape, dtype=np.int32)
+    grids = np.memmap(_history_file(path, 'bin'), dtype=np.int32, mode='r',
+                      shape=(num_years,) + grid_shape)
+    return years, grids
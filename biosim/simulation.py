@@ -7,9 +7,6 @@ from biosim.animal import Carnivore, Herbivore
 from biosim.cell import Highland, Lowland
 from biosim.island import Island
 import numpy as np
-import pandas as pd
-from biosim.visualisation import Visualisation
-import matplotlib.pyplot as plt
 import os
 
 _DEFAULT_GRAPHICS_DIR = os.path.join('../results', '')
@@ -23,6 +20,9 @@ _CONVERT_BINARY = 'magick'
 class BioSim:
     """
     BioSim Class used interface class for the simulations
+
+    matplotlib, pandas and the Visualisation class are only imported when they are first
+    needed, so a simulation run without graphics never imports them.
     """
 
     def __init__(
@@ -34,17 +34,24 @@ class BioSim:
             cmax_animals=None,
             hist_specs=None,
             img_base=None,
-            img_fmt="png"
+            img_fmt="png",
+            backend='object',
+            rng_mode='block'
     ):
 
-        np.random.seed(seed)
         self._animal_species = {'Carnivore': Carnivore, 'Herbivore': Herbivore}
         self._landscapes_with_changeable_parameters = {'H': Highland, 'L': Lowland}
         self._island_map = island_map
-        self._island = Island(island_map)
+        self._backend = backend
+        self._rng_mode = rng_mode
+        self._island = Island(island_map, backend, rng_mode, seed)
         self.add_population(ini_pop)
         self._vis = None
         self._fig = None
+        self._recorder = None
+        self._density_history = None
+        self._checkpoint_path = None
+        self._checkpoint_years = None
         self._final_year = None
         self._year = 0
         self.maximum = 0
@@ -76,6 +83,8 @@ class BioSim:
     :param hist_specs: Specifications for histograms, see below
     :param img_base: String with beginning of file name for figures, including path
     :param img_fmt: String with file type for figures, e.g. 'png'
+    :param backend: String with storage of animals in cells, 'object' or 'columnar'
+    :param rng_mode: String with mode of the random streams, 'block' or 'exact'
     If ymax_animals is None, the y-axis limit should be adjusted automatically.
     If cmax_animals is None, sensible, fixed default values should be used.
     cmax_animals is a dict mapping species names to numbers, e.g.,
@@ -90,6 +99,13 @@ class BioSim:
     '{}_{:05d}.{}'.format(img_base, img_no, img_fmt)
     where img_no are consecutive image numbers starting from 0.
     img_base should contain a path and beginning of a file name.
+    backend 'object' keeps one Python object per animal, 'columnar' keeps NumPy arrays of
+    age, weight, fitness and migration flag per species and cell, and runs the annual
+    cycle as array operations. Both give the same results for a given seed.
+    rng_mode 'block' draws the uniform random numbers for birth, death, migration and
+    predation in blocks sized to the cell population. 'exact' draws every number when it is
+    needed. The random numbers of every cell and phase come from their own stream derived
+    from the seed, so two simulations in the same process do not interfere.
     """
 
     def set_animal_parameters(self, species, params):
@@ -105,9 +121,7 @@ class BioSim:
         """
 
         if species in self._animal_species:
-            species_class = self._animal_species[species]
-            animal = species_class()
-            animal.set_given_parameters(params)
+            self._animal_species[species].set_given_parameters(params)
         else:
             raise TypeError(species + ' parameters can\'t be assigned, '
                                       'there is no such data type')
@@ -123,29 +137,37 @@ class BioSim:
         """
 
         if landscape in self._landscapes_with_changeable_parameters:
-            landscape = self._landscapes_with_changeable_parameters[landscape]
-            land = landscape()
-            land.set_given_parameters(params)
+            self._landscapes_with_changeable_parameters[landscape].set_given_parameters(params)
         else:
             raise TypeError(landscape + 'parameters can not be assigned')
 
     def simulate(self, num_years, vis_years=1, img_years=None):
         """
         Run simulation while visualizing the result.
+        If vis_years is None or 0, the simulation is run headless: no figure is made,
+        no images are saved and matplotlib is not imported.
 
         Parameters
         ----------
         num_years: number of years to simulate
-        vis_years: years between visualization updates
+        vis_years: years between visualization updates, None or 0 for no graphics
         img_years: years between visualizations saved to files (default: vis_years)
             Image files will be numbered consecutively.
 
         """
 
+        self._final_year = self._year + num_years
+        if self._density_history is not None:
+            self._density_history.reserve(num_years)
+        if not vis_years:
+            while self._year < self._final_year:
+                self._step()
+            self._flush_recording()
+            return
+
         if img_years is None:
             img_years = vis_years
 
-        self._final_year = self._year + num_years
         self._setup_graphics()
 
         while self._year < self._final_year:
@@ -155,23 +177,180 @@ class BioSim:
             if self._year % img_years == 0:
                 self._save_graphics()
 
-            self._island.annual_cycle()
-            self._year += 1
+            self._step()
+        self._flush_recording()
+
+    def _flush_recording(self):
+        """
+        Writes the recorded years not written yet, if recording, and the density history.
+        """
+        if self._recorder is not None:
+            self._recorder.flush()
+        if self._density_history is not None:
+            self._density_history.flush()
 
-    def _save_to_csv(self):
+    def _step(self):
+        """
+        Simulates one year, without updating the graphics.
+        """
+        self._island.annual_cycle()
+        self._year += 1
+        if self._recorder is not None:
+            self._recorder.record(self._year, self._island)
+        if self._density_history is not None:
+            self._density_history.record(self._year, self._island)
+        if self._checkpoint_path is not None and self._year % self._checkpoint_years == 0:
+            # the recordings hold at least the years of the checkpoint
+            self._flush_recording()
+            self.save_checkpoint(self._checkpoint_path)
+
+    def save_checkpoint(self, path):
+        """
+        Saves the full state of the simulation to a compressed .npz file of NumPy arrays:
+        the map, seed, backend and random stream mode, the year, the parameters of the
+        animal species and the state of the island (see Island.get_state).
+        The file is written under another name first and then renamed, so an earlier
+        checkpoint with the same name is only replaced by a complete one.
 
-        pass
+        Parameters
+        ----------
+        path: str
+            file name of the checkpoint
+        """
+        state = {'island_' + name: values for name, values in self._island.get_state().items()}
+        state.update({'map': np.array(self._island_map),
+                      'backend': np.array(self._backend),
+                      'rng_mode': np.array(self._rng_mode),
+                      'year': np.array(self._year),
+                      'ymax_animals': np.array(self.ymax_animals)})
+        for species, species_class in self._animal_species.items():
+            state[species + '_param_names'] = np.array(list(species_class.params))
+            state[species + '_param_values'] = np.array(list(species_class.params.values()),
+                                                        dtype=float)
+
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'wb') as checkpoint_file:
+            np.savez_compressed(checkpoint_file, **state)
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def from_checkpoint(cls, path, **kwargs):
+        """
+        Creates a simulation that continues from a checkpoint saved by save_checkpoint.
+        The continuation is the same as for the simulation that saved it.
+        The parameters of the animal species are set to the saved values.
 
-    #     df = self._animal_distribution
-    #     df.to_csv('../results/data.csv', sep='\t', encoding='utf-8')
+        Parameters
+        ----------
+        path: str
+            file name of the checkpoint
+        kwargs: dict
+            other arguments of the constructor, such as cmax_animals, hist_specs and img_base
+
+        Returns
+        -------
+        sim: BioSim
+        """
+        with np.load(path) as checkpoint:
+            state = dict(checkpoint)
+        sim = cls(str(state['map']), int(state['island_seed']), [],
+                  ymax_animals=float(state['ymax_animals']), backend=str(state['backend']),
+                  rng_mode=str(state['rng_mode']), **kwargs)
+        for species in sim._animal_species:
+            sim.set_animal_parameters(species, dict(zip(
+                state[species + '_param_names'].tolist(),
+                state[species + '_param_values'].tolist())))
+        sim._island.set_state({name[len('island_'):]: values for name, values in state.items()
+                               if name.startswith('island_')})
+        sim._year = int(state['year'])
+        return sim
+
+    def start_checkpoints(self, path, every_years):
+        """
+        Saves a checkpoint (see save_checkpoint) every every_years years, replacing the
+        previous one, until stop_checkpoints is called.
 
+        Parameters
+        ----------
+        path: str
+            file name of the checkpoint
+        every_years: int
         """
-        Saves animal_distribution as CSV file
+        self._checkpoint_path = path
+        self._checkpoint_years = every_years
 
+    def stop_checkpoints(self):
         """
-        df = self._animal_distribution
-        df.to_csv('../results/data.csv', sep='\t', encoding='utf-8')
+        Stops saving checkpoints.
+        """
+        self._checkpoint_path = None
+        self._checkpoint_years = None
 
+    def start_recording(self, path, summaries=False, densities=True, flush_years=100,
+                        mode='w'):
+        """
+        Starts streaming the state of the island to a recording, see Recorder. A row is
+        recorded after every simulated year, until stop_recording is called.
+        With mode 'a' an existing recording is continued, and the rows of the years after
+        the current year are dropped, as when the simulation is resumed from a checkpoint.
+
+        Parameters
+        ----------
+        path: str
+            directory of the recording
+        summaries: bool
+            True to record summaries of age, weight and fitness
+        densities: bool
+            True to record the number of animals in every cell
+        flush_years: int
+            number of years kept in memory before they are written
+        mode: str
+            'w' to start a new recording, 'a' to continue an existing recording
+        """
+        from biosim.recorder import Recorder
+
+        self.stop_recording()
+        self._recorder = Recorder(path, list(self._animal_species), self._island.cells_dims,
+                                  summaries, densities, flush_years, mode)
+        if mode == 'a':
+            self._recorder.truncate(self.year + 1)
+
+    def start_density_history(self, path, mode='w'):
+        """
+        Starts writing the number of animals of each species in every cell to a
+        memory-mapped density history on disk, see DensityHistory. The grids are written
+        after every simulated year, until stop_density_history is called.
+        With mode 'a' an existing history is continued, and years already in it are written
+        again, as when the simulation is resumed from a checkpoint.
+
+        Parameters
+        ----------
+        path: str
+            directory of the history
+        mode: str
+            'w' to start a new history, 'a' to continue an existing history
+        """
+        from biosim.recorder import DensityHistory
+
+        self.stop_density_history()
+        self._density_history = DensityHistory(path, list(self._animal_species),
+                                               self._island.cells_dims, mode)
+
+    def stop_density_history(self):
+        """
+        Writes the density history to disk, and stops writing to it.
+        """
+        if self._density_history is not None:
+            self._density_history.close()
+            self._density_history = None
+
+    def stop_recording(self):
+        """
+        Writes the years not written yet, and stops recording.
+        """
+        if self._recorder is not None:
+            self._recorder.close()
+            self._recorder = None
 
     def y_max(self):
         """
@@ -186,6 +365,9 @@ class BioSim:
         """
         Creates subplots.
         """
+        import matplotlib.pyplot as plt
+        from biosim.visualisation import Visualisation
+
         map_dims = self._island.cells_dims
 
         if self._fig is None:
@@ -202,13 +384,12 @@ class BioSim:
         """
         Updates graphics with current data.
         """
-        df = self._animal_distribution
-        rows, cols = self._island.cells_dims
-        dist_matrix_carnivore = np.array(df[['Carnivore']]).reshape(rows, cols)
-        dist_matrix_herbivore = np.array(df[['Herbivore']]).reshape(rows, cols)
+        import matplotlib.pyplot as plt
+
+        density_grids = self.density_grids
         self._update_animals_graph()
-        self._vis.update_herbivore_dist(dist_matrix_herbivore)
-        self._vis.update_carnivore_dist(dist_matrix_carnivore)
+        self._vis.update_herbivore_dist(density_grids['Herbivore'])
+        self._vis.update_carnivore_dist(density_grids['Carnivore'])
         plt.pause(1e-6)
         self._fig.suptitle('Year: ' + str(self.year + 1), x=0.5)  # shows first year as 1
 
@@ -260,24 +441,37 @@ class BioSim:
             num_per_species[species] = self._island.total_num_animals_per_species(species)
         return num_per_species
 
+    @property
+    def density_grids(self):
+        """
+        Number of animals per species in every cell, as arrays with the shape of the map.
+        The grids are kept up to date by the island, and are returned as read-only views
+        without copying.
+        Returns
+        -------
+        density_grids: dict
+            species (keys) and np.ndarray of int (values)
+        """
+        return {species: self._island.animal_count_grid(species)
+                for species in self._animal_species}
+
     @property
     def _animal_distribution(self):
         """
         Calculates Pandas DataFrame with animal count per species for each cell
-        on island.
+        on island, from density_grids. Only made when asked for, the graphics use
+        density_grids directly.
         Returns
         -------
         pd.DataFrame(count_df): data frame
         """
-        count_df = []
+        import pandas as pd
+
         rows, cols = self._island.cells_dims
-        for i in range(rows):
-            for j in range(cols):
-                cell = self._island.get_cells()[i, j]
-                animals_count = cell.cell_fauna_count
-                count_df.append({'Row': i, 'Col': j,
-                                 'Herbivore': animals_count['Herbivore'],
-                                 'Carnivore': animals_count['Carnivore']})
+        count_df = {'Row': np.repeat(np.arange(rows), cols),
+                    'Col': np.tile(np.arange(cols), rows)}
+        for species, grid in self.density_grids.items():
+            count_df[species] = grid.ravel()
         return pd.DataFrame(count_df)
 
     def _save_graphics(self):
@@ -287,9 +481,9 @@ class BioSim:
         if self._img_base is None:
             return
 
-        plt.savefig('{base}_{num:05d}.{type}'.format(base=self._img_base,
-                                                    num=self._img_ctr,
-                                                    type=self._img_fmt))
+        self._fig.savefig('{base}_{num:05d}.{type}'.format(base=self._img_base,
+                                                           num=self._img_ctr,
+                                                           type=self._img_fmt))
         self._img_ctr += 1
 
     def make_movie(self, movie_fmt=_DEFAULT_MOVIE_FORMAT):
@@ -0,0 +1,17 @@
+import pytest
+from biosim.animal import Herbivore, Carnivore
+from biosim.cell import Highland, Lowland
+
+
+@pytest.fixture(autouse=True)
+def restore_parameters():
+    """
+    Restore the parameters of the animal and landscape classes after every test, since
+    set_given_parameters changes them for all later tests
+    """
+    saved = [(cls.params, dict(cls.params)) for cls in (Herbivore, Carnivore)] + \
+            [(cls.parameters, dict(cls.parameters)) for cls in (Highland, Lowland)]
+    yield
+    for parameters, values in saved:
+        parameters.clear()
+        parameters.update(values)
@@ -1,5 +1,6 @@
 import pytest
-from biosim.animal import Herbivore, Carnivore
+from biosim.animal import Animal, Herbivore, Carnivore
+from biosim.randomstream import RandomStream
 from scipy.stats import kstest
 from scipy import stats
 import numpy as np
@@ -213,3 +214,123 @@ class TestAnimal:
             assert self.animal[species].check_if_migrates() is False
             self.animal[species].grow_older()
             assert self.animal[species].has_migrated_this_year is False
+
+    def test_fitness_cached(self):
+        """
+        Firstly: To test that fitness is only evaluated once as long as the animal is unchanged
+        Secondly: To test that eating, aging and changing parameters lead to a new evaluation
+        """
+        herb = Herbivore(age=5, weight=20)
+        Animal.fitness_evaluations = 0
+        for _ in range(10):
+            herb.calculate_fitness()
+        assert Animal.fitness_evaluations == 1
+
+        herb.eat()
+        fitness_after_eating = herb.calculate_fitness()
+        assert Animal.fitness_evaluations == 2
+        assert fitness_after_eating == Herbivore._fitness_formula(
+            5, 20 + Herbivore.params['beta'] * Herbivore.params['F'], Herbivore.params)
+        herb.grow_older()
+        herb.calculate_fitness()
+        assert Animal.fitness_evaluations == 3
+
+        herb.weight = herb.weight  # no actual change
+        herb.calculate_fitness()
+        assert Animal.fitness_evaluations == 3
+
+        Herbivore.set_given_parameters({'phi_age': Herbivore.params['phi_age']})
+        herb.calculate_fitness()
+        assert Animal.fitness_evaluations == 4
+
+    def test_fitness_array(self):
+        """
+        To test that the batch fitness gives the same values as the scalar fitness,
+        including zero fitness for zero weight, and that it fills the cached fitness
+        """
+        animals = [Herbivore(age=a, weight=w) for a, w in [(0, 0), (5, 20.), (60, 3.5)]]
+        age = np.array([animal.age for animal in animals])
+        weight = np.array([animal.weight for animal in animals])
+        fitness = Herbivore.calculate_fitness_array(age, weight)
+        for animal, fit in zip(animals, fitness):
+            assert fit == pytest.approx(animal.calculate_fitness())
+
+        fresh = [Herbivore(age=5, weight=20.) for _ in range(3)]
+        Herbivore.update_fitness_of_animals(fresh)
+        Animal.fitness_evaluations = 0
+        assert fresh[0].calculate_fitness() == pytest.approx(fitness[1])
+        assert Animal.fitness_evaluations == 0
+
+    def test_compact_layout(self):
+        """
+        To test that animal objects have no per-instance dictionary, and that new attributes
+        can't be added by mistake
+        """
+        for animal in self.animal:
+            assert not hasattr(animal, '__dict__')
+            with pytest.raises(AttributeError):
+                animal.colour = 'brown'
+
+    def test_procreation_array(self, mocker):
+        """
+        Firstly: To test that a single animal can't give birth
+        Secondly: To test that only heavy enough mothers give birth when the probability holds
+        and that the mother can afford the newborn weight
+        """
+        stream = RandomStream()
+        mothers, newborn_weight = Herbivore.procreation_array(np.array([50.]), np.array([1.]),
+                                                              stream)
+        assert len(mothers) == 0
+
+        mocker.patch('biosim.randomstream.RandomStream._draw', side_effect=np.zeros)
+        weight = np.array([5., 50., 60., 1.])
+        fitness = Herbivore.calculate_fitness_array(np.full(4, 5), weight)
+        mothers, newborn_weight = Herbivore.procreation_array(weight, fitness, stream)
+        assert set(mothers) <= {1, 2}
+        assert np.all(weight[mothers] >= Herbivore.params['xi'] * newborn_weight)
+
+    def test_hunt_array_same_as_eat(self):
+        """
+        To test that the predation engine eats the same herbivores and gives the carnivores
+        the same weights as carnivores eating one by one with eat, for the same random numbers
+        """
+        np.random.seed(SEED)
+        herbs = [Herbivore(age=np.random.randint(0, 30)) for _ in range(200)]
+        carns = [Carnivore(age=np.random.randint(0, 30), weight=float(np.random.uniform(5, 40)))
+                 for _ in range(20)]
+        prey_weight = np.array([herb.weight for herb in herbs])
+        prey_fitness = np.array([herb.calculate_fitness() for herb in herbs])
+        age = np.array([carn.age for carn in carns])
+        weight = np.array([carn.weight for carn in carns])
+        fitness = np.array([carn.calculate_fitness() for carn in carns])
+
+        prey_order, hunter_order, eaten, new_weight, _ = Carnivore.hunt_array(
+            age, weight, fitness, prey_weight, prey_fitness, RandomStream('exact', seed=SEED))
+
+        stream = RandomStream('exact', seed=SEED)
+        survivors = sorted(herbs, key=lambda x: x.calculate_fitness())
+        eaten_one_by_one = []
+        for carn in sorted(carns, key=lambda x: x.calculate_fitness(), reverse=True):
+            eaten_by_carn = carn.eat(survivors, stream)
+            eaten_one_by_one.extend(eaten_by_carn)
+            survivors = [herb for herb in survivors if herb not in eaten_by_carn]
+
+        assert eaten.sum() > 0
+        assert {id(herbs[i]) for i in np.flatnonzero(eaten)} == set(map(id, eaten_one_by_one))
+        assert new_weight == pytest.approx([carn.weight for carn in carns])
+
+    @pytest.mark.parametrize('available_fodder, expected',
+                             [(0., [0, 0, 0, 0]),
+                              (25., [10, 10, 5, 0]),
+                              (30., [10, 10, 10, 0]),
+                              (100., [10, 10, 10, 10])])
+    def test_graze_array(self, available_fodder, expected):
+        """
+        To test that herbivores before the cutoff eat F, the one at the cutoff eats the rest,
+        and the fodder left is correct
+        """
+        order, portions, fodder_left = Herbivore.graze_array(4, available_fodder,
+                                                             RandomStream())
+        assert sorted(order) == [0, 1, 2, 3]
+        assert list(portions) == pytest.approx(np.array(expected) * Herbivore.params['F'] / 10)
+        assert fodder_left == pytest.approx(max(available_fodder - 4 * Herbivore.params['F'], 0))
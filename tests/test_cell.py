@@ -1,7 +1,13 @@
 import pytest
+import numpy as np
+from scipy import stats
+from biosim.animal import Herbivore
 from biosim.cell import Cell, Water, Desert, Highland, Lowland
 from biosim.island import Island
 
+SEED = 12345678  # random seed for tests
+ALPHA = 0.01  # significance level for statistical tests
+
 
 class TestCell:
 
@@ -45,6 +51,70 @@ class TestCell:
             self.cell.get_num_animals("Carnivore")
         assert num_after_dying <= num_before_dying
 
+    @pytest.mark.parametrize('backend', ['object', 'columnar'])
+    def test_death_statistics(self, backend):
+        """
+        To test that the batch death step gives the same survival statistics as calling
+        is_dying for every animal
+        """
+        np.random.seed(SEED)
+        ini_herb = [{'species': 'Herbivore', 'age': age, 'weight': weight}
+                    for age in range(0, 50, 5) for weight in range(2, 40, 4)]
+        num_trials = 50
+        deaths_batch = 0
+        deaths_single = 0
+        for _ in range(num_trials):
+            cell = Lowland(backend=backend)
+            cell.place_animals(ini_herb)
+            cell.animals_die()
+            deaths_batch += len(ini_herb) - cell.get_num_animals('Herbivore')
+
+            animals = [Herbivore(dct['age'], dct['weight']) for dct in ini_herb]
+            deaths_single += sum(animal.is_dying() for animal in animals)
+
+        num_animals = num_trials * len(ini_herb)
+        contingency_table = np.array([[deaths_batch, num_animals - deaths_batch],
+                                      [deaths_single, num_animals - deaths_single]])
+        chi2_stat, p_val, dof, ex = stats.chi2_contingency(contingency_table)
+        assert p_val > ALPHA
+
+    @pytest.mark.parametrize('backend', ['object', 'columnar'])
+    def test_birth_statistics(self, backend):
+        """
+        To test that batch procreation gives the same number of births as calling
+        create_newborn for every animal, and that mothers lose weight
+        """
+        np.random.seed(SEED)
+        ini_herb = [{'species': 'Herbivore', 'age': 10, 'weight': weight}
+                    for weight in range(20, 60, 2)]
+        num_trials = 50
+        births_batch = 0
+        births_single = 0
+        for _ in range(num_trials):
+            cell = Lowland(backend=backend)
+            cell.place_animals(ini_herb)
+            cell.procreation()
+            births_batch += cell.get_num_animals('Herbivore') - len(ini_herb)
+
+            animals = [Herbivore(dct['age'], dct['weight']) for dct in ini_herb]
+            births_single += sum(animal.create_newborn(len(animals)) is not None
+                                 for animal in animals)
+
+        num_animals = num_trials * len(ini_herb)
+        contingency_table = np.array([[births_batch, num_animals - births_batch],
+                                      [births_single, num_animals - births_single]])
+        chi2_stat, p_val, dof, ex = stats.chi2_contingency(contingency_table)
+        assert p_val > ALPHA
+
+    def test_death_compacts_in_place(self):
+        """
+        To test that the list of animals is compacted in place, not replaced
+        """
+        self.cell.place_animals(self.ini_herb)
+        herbivores = self.cell.herbivores_list
+        self.cell.animals_die()
+        assert self.cell.herbivores_list is herbivores
+
     def available_fodder(self):
         """
         To test if the herbivores eat, the amount of fodder decreases in a cell
@@ -61,7 +131,8 @@ class TestCell:
         """
         self.cell.place_animals(self.ini_herb + self.ini_carn)
         num_herb_before_prey = self.cell.get_num_animals("Herbivore")
-        mocker.patch('numpy.random.random', return_value=0)  # Carnivores will definitely prey
+        # Carnivores will definitely prey
+        mocker.patch('biosim.randomstream.RandomStream._draw', side_effect=np.zeros)
         self.cell.carn_eat()
         num_herb_after_prey = self.cell.get_num_animals("Herbivore")
         assert num_herb_after_prey < num_herb_before_prey
@@ -81,7 +152,8 @@ class TestCell:
         num_carns_before_proc = len(self.cell.carnivores_list)
         for _ in range(30):
             self.cell.carn_eat()
-        mocker.patch('numpy.random.random', return_value=0)  # Animals will definitely procreate
+        # Animals will definitely procreate
+        mocker.patch('biosim.randomstream.RandomStream._draw', side_effect=np.zeros)
         self.cell.procreation()
         num_carns_after_proc = len(self.cell.carnivores_list)
         assert num_carns_after_proc > num_carns_before_proc
@@ -117,3 +189,71 @@ class TestCell:
         h = Highland()
         l = Lowland()
         assert h.available_fodder < l.available_fodder
+
+    def test_columnar_backend(self, mocker):
+        """
+        To test that a cell with the columnar backend has the same interface:
+        placing, counting and a full year of happenings
+        """
+        cell = Lowland(backend='columnar')
+        cell.place_animals(self.ini_herb + self.ini_carn)
+        assert cell.cell_fauna_count == {'Herbivore': 30, 'Carnivore': 20}
+        cell.animals_eat()
+        cell.procreation()
+        cell.animals_age_by_one_year()
+        mocker.patch('biosim.randomstream.RandomStream._draw', side_effect=np.zeros)
+        cell.animals_die()
+        assert cell.cell_fauna_count == {'Herbivore': 0, 'Carnivore': 0}
+
+    def test_unknown_backend(self):
+        """
+        To test that an unknown backend raises ValueError
+        """
+        with pytest.raises(ValueError):
+            Cell(backend='dataframe')
+
+    @pytest.mark.parametrize('backend', ['object', 'columnar'])
+    def test_migrate_batches(self, backend, mocker):
+        """
+        To test that migrating animals are removed from the cell as one batch per destination,
+        that animals choosing Water stay, and that no animal migrates twice a year
+        """
+        mocker.patch('biosim.randomstream.RandomStream._draw', side_effect=np.zeros)
+        cell = Lowland(backend)
+        cell.place_animals(self.ini_herb + self.ini_carn)
+
+        blocked = [Water(backend)] + [Lowland(backend) for _ in range(3)]
+        assert cell.migrate(blocked) == {}
+        assert cell.cell_fauna_count == {'Herbivore': 30, 'Carnivore': 20}
+        assert cell.migrate([Lowland(backend) for _ in range(4)]) == {}
+
+        cell.animals_age_by_one_year()
+        adj_cells = [Lowland(backend) for _ in range(4)]
+        migration_dct = cell.migrate(adj_cells)
+        assert list(migration_dct) == [adj_cells[0]]
+        herbivores, carnivores = migration_dct[adj_cells[0]]
+        assert (len(herbivores), len(carnivores)) == (30, 20)
+        assert cell.cell_fauna_count == {'Herbivore': 0, 'Carnivore': 0}
+
+        adj_cells[0].add_migrated_animals(herbivores, carnivores)
+        assert adj_cells[0].cell_fauna_count == {'Herbivore': 30, 'Carnivore': 20}
+
+    @pytest.mark.parametrize('backend', ['object', 'columnar'])
+    def test_animal_state_after_parameters(self, backend, mocker):
+        """
+        To test that fitness calculated before the parameters are set is saved as NaN, and
+        that restored animals get the fitness of the new parameters
+        """
+        mocker.patch.dict(Herbivore.params)
+        cell = Lowland(backend)
+        cell.place_animals(self.ini_herb)
+        cell.animal_properties('Herbivore')
+        assert not np.any(np.isnan(cell.animal_state('Herbivore')[3]))
+        Herbivore.set_given_parameters({'phi_weight': 0.5, 'w_half': 30.})
+        state = cell.animal_state('Herbivore')
+        assert np.all(np.isnan(state[3]))
+
+        restored = Lowland(backend)
+        restored.restore_animals('Herbivore', *state)
+        expected = Herbivore.calculate_fitness_array(state[0], state[1])
+        assert restored.animal_properties('Herbivore')[2] == pytest.approx(expected)
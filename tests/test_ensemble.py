@@ -0,0 +1,73 @@
+import pytest
+import numpy as np
+from biosim.ensemble import run_ensemble, _run_replicate
+from biosim.simulation import BioSim
+from biosim.animal import Herbivore
+
+
+class TestEnsemble:
+
+    @pytest.fixture(autouse=True)
+    def create_scenario(self):
+        """
+        Create a small scenario
+        """
+        self.scenario = {'island_map': 'WWWW\nWLLW\nWLHW\nWWWW',
+                         'ini_pop': [{'loc': (2, 2),
+                                      'pop': [{'species': 'Herbivore', 'age': 5, 'weight': 20}
+                                              for _ in range(20)]}],
+                         'num_years': 5}
+
+    def test_replicate_same_as_biosim(self):
+        """
+        To test that a replicate gives the same numbers as a BioSim run with the same seed
+        """
+        counts = _run_replicate(self.scenario, 3)
+        sim = BioSim(self.scenario['island_map'], 3, self.scenario['ini_pop'])
+        sim.simulate(5, vis_years=None)
+        assert counts.shape == (6, 2)
+        assert counts[-1, 0] == sim.num_animals_per_species['Herbivore']
+
+    def test_animal_parameters(self, mocker):
+        """
+        To test that the animal parameters of the scenario are used, also for the initial
+        population placed before they are set
+        """
+        mocker.patch.dict(Herbivore.params)
+        without_parameters = _run_replicate(self.scenario, 3)
+        self.scenario['animal_parameters'] = {'Herbivore': {'phi_weight': 0.5, 'omega': 0.9}}
+        counts = _run_replicate(self.scenario, 3)
+        sim = BioSim(self.scenario['island_map'], 3, [])
+        sim.set_animal_parameters('Herbivore', {'phi_weight': 0.5, 'omega': 0.9})
+        sim.add_population(self.scenario['ini_pop'])
+        sim.simulate(5, vis_years=None)
+        assert counts[-1, 0] == sim.num_animals_per_species['Herbivore']
+        assert not np.array_equal(counts, without_parameters)
+        self.scenario['backend'] = 'columnar'
+        assert np.array_equal(_run_replicate(self.scenario, 3), counts)
+
+    def test_statistics(self):
+        """
+        To test that the statistics have one value per year, and that the quantiles are
+        ordered and contain the mean
+        """
+        statistics = run_ensemble(self.scenario, [1, 2, 3, 4], quantiles=(0, 0.5, 1),
+                                  num_workers=2)
+        herbivores = statistics['Herbivore']
+        assert statistics['year'].tolist() == list(range(6))
+        assert herbivores['mean'][0] == 20
+        assert herbivores['quantiles'].shape == (3, 6)
+        assert np.all(np.diff(herbivores['quantiles'], axis=0) >= 0)
+        assert np.all(herbivores['quantiles'][0] <= herbivores['mean'])
+        assert np.all(herbivores['mean'] <= herbivores['quantiles'][-1])
+        assert np.all(statistics['Carnivore']['mean'] == 0)
+
+    def test_not_valid(self):
+        """
+        To test that a missing seed list or scenario key raises ValueError
+        """
+        with pytest.raises(ValueError):
+            run_ensemble(self.scenario, [])
+        del self.scenario['num_years']
+        with pytest.raises(ValueError):
+            run_ensemble(self.scenario, [1])
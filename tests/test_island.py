@@ -1,5 +1,7 @@
 import pytest
+import numpy as np
 from biosim.island import Island
+from biosim.animal import Carnivore
 
 
 class TestIsland:
@@ -43,8 +45,8 @@ class TestIsland:
                               for _ in range(50)]}
                      ]
         self.island.place_animals(ini_herbs + ini_carns)
-        mocker.patch('numpy.random.random', return_value=0)  # To be assured that migration, death
-        # and procreation happen
+        # To be assured that migration, death and procreation happen
+        mocker.patch('biosim.randomstream.RandomStream._draw', side_effect=np.zeros)
         num_animals_before_cycle = self.island.total_num_animals_per_species('Herbivore') + \
             self.island.total_num_animals_per_species('Carnivore')
         self.island.annual_cycle()
@@ -52,3 +54,214 @@ class TestIsland:
             self.island.total_num_animals_per_species('Carnivore')
 
         assert num_animals_after_cycle is not num_animals_before_cycle
+
+    def test_columnar_backend_annual_cycle(self):
+        """
+        To test that the columnar backend keeps animals on land and that results
+        of both backends are comparable after some years
+        """
+        ini_herbs = [{'loc': (2, 3),
+                      'pop': [{'species': 'Herbivore',
+                               'age': 5,
+                               'weight': 20}
+                              for _ in range(50)]}]
+        counts = {}
+        for backend in ['object', 'columnar']:
+            island = Island(self.island._map, backend=backend)
+            island.place_animals(ini_herbs)
+            for _ in range(20):
+                island.annual_cycle()
+            counts[backend] = island.total_num_animals_per_species('Herbivore')
+            assert island.get_cells()[4, 2].get_num_animals('Herbivore') == 0
+        assert counts['columnar'] > 0
+        assert abs(counts['columnar'] - counts['object']) < 0.5 * counts['object']
+
+    def test_backends_same_trajectory(self):
+        """
+        To test that both backends give the same population in every cell for the same seed
+        """
+        ini_pop = [{'loc': (2, 3),
+                    'pop': ([{'species': 'Herbivore', 'age': 5, 'weight': 20}
+                             for _ in range(50)] +
+                            [{'species': 'Carnivore', 'age': 5} for _ in range(10)])}]
+        grids = []
+        for backend in ['object', 'columnar']:
+            island = Island(self.island._map, backend=backend, seed=1)
+            island.place_animals(ini_pop)
+            for _ in range(10):
+                island.annual_cycle()
+            grids.append([island.animal_count_grid(species)
+                          for species in ['Herbivore', 'Carnivore']])
+        assert np.array_equal(grids[0], grids[1])
+        assert grids[0][0].sum() > 0
+
+    def test_backends_same_after_parameters(self, mocker):
+        """
+        To test that both backends use the new parameters for animals placed before the
+        parameters are set
+        """
+        mocker.patch.dict(Carnivore.params)
+        ini_pop = [{'loc': (2, 3),
+                    'pop': ([{'species': 'Herbivore', 'age': 5, 'weight': 20}
+                             for _ in range(50)] +
+                            [{'species': 'Carnivore', 'age': 5, 'weight': 20}
+                             for _ in range(10)])}]
+        defaults = {name: Carnivore.params[name] for name in ['phi_weight', 'w_half']}
+        grids = []
+        for backend in ['object', 'columnar']:
+            Carnivore.set_given_parameters(defaults)
+            island = Island(self.island._map, backend=backend, seed=1)
+            island.place_animals(ini_pop)
+            Carnivore.set_given_parameters({'phi_weight': 0.1, 'w_half': 30.})
+            island.annual_cycle()
+            grids.append([island.animal_count_grid(species)
+                          for species in ['Herbivore', 'Carnivore']])
+        assert np.array_equal(grids[0], grids[1])
+
+    def test_timed_annual_cycle(self):
+        """
+        To test that the timed annual cycle gives the time of every phase, and the same
+        population as the fused annual cycle
+        """
+        ini_herbs = [{'loc': (2, 3),
+                      'pop': [{'species': 'Herbivore',
+                               'age': 5,
+                               'weight': 20}
+                              for _ in range(50)]}]
+        counts = []
+        for timed in [False, True]:
+            island = Island(self.island._map, seed=1)
+            island.place_animals(ini_herbs)
+            if timed:
+                island.enable_timing()
+            for _ in range(5):
+                island.annual_cycle()
+            counts.append(island.total_num_animals_per_species('Herbivore'))
+        assert counts[0] == counts[1]
+        assert set(island.phase_times) == set(Island.phases)
+        assert all(seconds > 0 for seconds in island.phase_times.values())
+
+    def test_occupied_cells(self, mocker):
+        """
+        To test that the occupied cells follow placement, migration and death, and that a
+        grazed cell regrows its fodder after the animals have left
+        """
+        self.island.place_animals([{'loc': (2, 3),
+                                    'pop': [{'species': 'Herbivore', 'age': 5, 'weight': 20}
+                                            for _ in range(100)]}])
+        assert [loc for loc, _ in self.island.occupied_cells()] == [(1, 2)]
+
+        # no animal dies and every animal migrates down in the first year, all die next year
+        mocker.patch('biosim.cell.Cell.animals_die')
+        mocker.patch('biosim.animal.Animal.migration_array',
+                     side_effect=lambda fitness, has_migrated, stream:
+                     np.where(has_migrated, -1, 1))
+        self.island.annual_cycle()
+        assert [loc for loc, _ in self.island.occupied_cells()] == [(2, 2)]
+        grazed = self.island.get_cells()[1, 2]
+        assert grazed.get_fodder() < grazed.parameters['f_max']
+
+        mocker.stopall()
+        mocker.patch('biosim.randomstream.RandomStream._draw', side_effect=np.zeros)
+        self.island.annual_cycle()
+        assert self.island.occupied_cells() == []
+        assert grazed.get_fodder() == grazed.parameters['f_max']
+
+    def test_neighbour_table(self):
+        """
+        To test that the neighbour table gives the cells up, down, left and right of a cell,
+        and that the habitability mask marks Water cells
+        """
+        cells = self.island.get_cells()
+        assert self.island.get_adj_cells(2, 1) == [cells[1, 1], cells[3, 1],
+                                                   cells[2, 0], cells[2, 2]]
+        assert len(self.island.get_adj_cells(0, 0)) == 2
+        neighbours = self.island._neighbours[2 * 8 + 1]
+        assert self.island._habitable[neighbours].tolist() == [True, True, False, True]
+
+    @pytest.mark.parametrize('island_map', ['WWW\nWXW\nWWW', 'WWW\nWLLW\nWWW', 'WWW\nWLL\nWWW'])
+    def test_invalid_map(self, island_map):
+        """
+        To test that unknown landscape types, inconsistent dimensions and land on the border
+        raise ValueError
+        """
+        with pytest.raises(ValueError):
+            Island(island_map)
+
+    def test_cells_created_lazily(self):
+        """
+        To test that cells are only created when needed, and are the same as fresh cells
+        """
+        island = Island('\n'.join(['W' * 500] + ['W' + 'L' * 498 + 'W'] * 498 + ['W' * 500]))
+        assert 501 not in island._land_cells
+        island.place_animals([{'loc': (2, 2),
+                               'pop': [{'species': 'Herbivore', 'age': 5, 'weight': 20}]}])
+        cell = island._land_cells[501]
+        assert type(cell).__name__ == 'Lowland'
+        assert cell.get_fodder() == cell.parameters['f_max']
+        assert 502 not in island._land_cells
+        assert type(island.get_cells()[1, 2]).__name__ == 'Lowland'
+
+    def test_water_shared(self):
+        """
+        To test that all Water cells are one shared Water object that can not be changed,
+        and that only land cells are kept by the island
+        """
+        cells = self.island.get_cells()
+        water = [cell for cell in cells.flat if type(cell).__name__ == 'Water']
+        assert len(water) == 32
+        assert all(cell is water[0] for cell in water)
+        assert len(self.island._land_cells) == cells.size - 32
+        with pytest.raises(AttributeError):
+            water[0].available_fodder = 10
+        with pytest.raises(ValueError):
+            water[0].add_migrated_animals([], [])
+
+    @pytest.mark.parametrize('backend', ['object', 'columnar'])
+    def test_counts_follow_cells(self, backend):
+        """
+        To test that the totals and count grids kept by the island are the same as counting
+        the animals in every cell
+        """
+        island = Island(self.island._map, backend=backend)
+        island.place_animals([{'loc': (2, 3),
+                               'pop': ([{'species': 'Herbivore', 'age': 5, 'weight': 20}
+                                        for _ in range(50)] +
+                                       [{'species': 'Carnivore', 'age': 5, 'weight': 20}
+                                        for _ in range(10)])}])
+        for _ in range(10):
+            island.annual_cycle()
+            for species in ['Herbivore', 'Carnivore']:
+                count_grid = np.vectorize(lambda cell: cell.get_num_animals(species))(
+                    island.get_cells())
+                assert np.array_equal(island.animal_count_grid(species), count_grid)
+                assert island.total_num_animals_per_species(species) == count_grid.sum()
+        with pytest.raises(ValueError):
+            island.total_num_animals_per_species('Rabbit')
+
+    @pytest.mark.parametrize('backend', ['object', 'columnar'])
+    def test_place_animals_again(self, backend):
+        """
+        To test that animals placed in a cell again in the same year, after placing in
+        another cell, do not get the same weights as the animals placed first
+        """
+        island = Island(self.island._map, backend=backend, seed=1)
+        pop = [{'species': 'Herbivore', 'age': 5} for _ in range(3)]
+        island.place_animals([{'loc': (2, 2), 'pop': pop},
+                              {'loc': (2, 3), 'pop': pop},
+                              {'loc': (2, 2), 'pop': pop}])
+        _, weights, _ = island.get_cells()[1, 1].animal_properties('Herbivore')
+        assert len(set(weights)) == 6
+
+    def test_state_without_animals(self):
+        """
+        To test that the state of an island without animals has the animal arrays of every
+        species, and can be restored
+        """
+        state = Island(self.island._map, seed=1).get_state()
+        for species in ['Herbivore', 'Carnivore']:
+            for name in ['cell', 'age', 'weight', 'has_migrated', 'fitness']:
+                assert state[species + '_' + name].shape == (0,)
+        island = Island(self.island._map, seed=1)
+        island.set_state(state)
+        assert island.total_num_animals_per_species('Herbivore') == 0
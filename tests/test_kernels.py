@@ -0,0 +1,105 @@
+import pytest
+import numpy as np
+from biosim import kernels
+from biosim.animal import Herbivore, Carnivore
+from biosim.island import Island
+from biosim.randomstream import RandomStream
+
+SEED = 12345678  # random seed for tests
+
+
+class TestKernels:
+
+    @pytest.fixture(autouse=True)
+    def create_animals(self):
+        """
+        Create ages, weights and fitness of herbivores and carnivores
+        """
+        generator = np.random.default_rng(SEED)
+        self.herb_age = generator.integers(0, 30, 300).astype(float)
+        self.herb_weight = generator.uniform(0, 40, 300)
+        self.herb_fitness = Herbivore.calculate_fitness_array(self.herb_age, self.herb_weight)
+        self.carn_age = generator.integers(0, 30, 40).astype(float)
+        self.carn_weight = generator.uniform(5, 40, 40)
+        self.carn_fitness = Carnivore.calculate_fitness_array(self.carn_age, self.carn_weight)
+
+    def run_both(self, mocker, function, mode='block'):
+        """
+        Result of function with and without the kernels, for the same random numbers.
+        The pure Python versions of the kernels are used if Numba is not installed.
+        """
+        results = []
+        for enabled in [False, True]:
+            mocker.patch.dict('biosim.kernels._jit', {'enabled': enabled})
+            results.append(function(RandomStream(mode, seed=SEED)))
+        return results
+
+    def test_use_jit(self):
+        """
+        To test that the kernels are only switched on if they can be compiled
+        """
+        assert kernels.use_jit() == kernels.available()
+        assert kernels.jit_enabled() == kernels.available()
+        assert not kernels.use_jit(False)
+        assert not kernels.jit_enabled()
+
+    @pytest.mark.parametrize('mode', RandomStream.modes)
+    def test_hunt_same_as_reference(self, mocker, mode):
+        """
+        To test that the hunt kernel eats the same herbivores and gives the carnivores the
+        same weights as hunt_array, and leaves the stream at the same number
+        """
+        def hunt(stream):
+            _, _, eaten, weight, fitness = Carnivore.hunt_array(
+                self.carn_age, self.carn_weight, self.carn_fitness, self.herb_weight,
+                self.herb_fitness, stream)
+            return eaten, weight, fitness, stream.random()
+
+        reference, kernel = self.run_both(mocker, hunt, mode)
+        assert reference[0].sum() > 0
+        assert np.array_equal(reference[0], kernel[0])
+        assert kernel[1] == pytest.approx(reference[1])
+        assert kernel[2] == pytest.approx(reference[2])
+        assert reference[3] == kernel[3]
+
+    @pytest.mark.parametrize('available_fodder', [1234., 0., -5.])
+    def test_decisions_same_as_reference(self, mocker, available_fodder):
+        """
+        To test that the kernels for death, migration, procreation and grazing give the same
+        decisions as the NumPy code, also when there is no fodder left
+        """
+        has_migrated = np.arange(300) % 3 == 0
+
+        def decide(stream):
+            dying = Herbivore.is_dying_array(self.herb_weight, self.herb_fitness, stream)
+            directions = Herbivore.migration_array(self.herb_fitness, has_migrated, stream)
+            mothers, newborn_weight = Herbivore.procreation_array(self.herb_weight,
+                                                                  self.herb_fitness, stream)
+            order, portions, fodder_left = Herbivore.graze_array(300, available_fodder, stream)
+            return dying, directions, mothers, newborn_weight, order, portions, fodder_left
+
+        reference, kernel = self.run_both(mocker, decide)
+        for reference_result, kernel_result in zip(reference, kernel):
+            assert np.asarray(kernel_result) == pytest.approx(np.asarray(reference_result))
+
+    def test_annual_cycle_same_as_reference(self, mocker):
+        """
+        To test that an island gives the same population with and without the kernels
+        """
+        island_map = 'WWWWW\nWLLLW\nWLHLW\nWWWWW'
+        ini_pop = [{'loc': (2, 2),
+                    'pop': ([{'species': 'Herbivore', 'age': 5, 'weight': 20}
+                             for _ in range(100)] +
+                            [{'species': 'Carnivore', 'age': 5, 'weight': 20}
+                             for _ in range(20)])}]
+
+        def counts(stream):
+            island = Island(island_map, backend='columnar', seed=SEED)
+            island.place_animals(ini_pop)
+            for _ in range(10):
+                island.annual_cycle()
+            return [island.animal_count_grid(species).tolist()
+                    for species in ['Herbivore', 'Carnivore']]
+
+        reference, kernel = self.run_both(mocker, counts)
+        assert reference == kernel
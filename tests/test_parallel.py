@@ -0,0 +1,68 @@
+import pytest
+from biosim.island import Island
+from biosim.parallel import ParallelIsland
+
+SEED = 12345
+
+
+class TestParallelIsland:
+
+    @pytest.fixture(autouse=True)
+    def create_map(self):
+        """
+        Create a map and a population placed on both sides of the middle row
+        """
+        self.island_map = '\n'.join(['W' * 12] + ['W' + 'L' * 10 + 'W'] * 10 + ['W' * 12])
+        self.ini_pop = [{'loc': (loc, 6),
+                         'pop': [{'species': 'Herbivore', 'age': 5, 'weight': 20}
+                                 for _ in range(50)]}
+                        for loc in [6, 7]]
+
+    def run(self, num_workers, years=5):
+        """
+        Number of herbivores in each stripe after some years
+        """
+        with ParallelIsland(self.island_map, SEED, num_workers) as island:
+            island.place_animals(self.ini_pop)
+            for _ in range(years):
+                island.annual_cycle()
+            return island.num_animals_per_stripe('Herbivore')
+
+    def test_same_as_serial(self):
+        """
+        To test that the result is the same as for the serial Island with the same seed,
+        for any number of workers
+        """
+        island = Island(self.island_map, seed=SEED)
+        island.place_animals(self.ini_pop)
+        for _ in range(5):
+            island.annual_cycle()
+        expected = island.total_num_animals_per_species('Herbivore')
+        for num_workers in [1, 2, 3]:
+            assert sum(self.run(num_workers)) == expected
+
+    def test_deterministic(self):
+        """
+        To test that the result is the same for the same seed and number of workers, and
+        that animals live in both stripes
+        """
+        counts = self.run(2)
+        assert counts == self.run(2)
+        assert all(count > 0 for count in counts)
+
+    def test_migrants_cross_stripes(self):
+        """
+        To test that animals placed in one stripe migrate into the other
+        """
+        self.ini_pop = self.ini_pop[:1]
+        assert self.run(2, years=10)[1] > 0
+
+    def test_place_animals_not_valid(self):
+        """
+        To test that placing animals in Water or outside the Island raises ValueError
+        """
+        with ParallelIsland(self.island_map, SEED, 2) as island:
+            with pytest.raises(ValueError):
+                island.place_animals([{'loc': (1, 1), 'pop': self.ini_pop[0]['pop']}])
+            with pytest.raises(ValueError):
+                island.place_animals([{'loc': (20, 1), 'pop': self.ini_pop[0]['pop']}])
@@ -0,0 +1,114 @@
+import pytest
+import numpy as np
+from biosim.animal import Herbivore, Carnivore
+from biosim.population import Population
+from biosim.randomstream import RandomStream
+
+
+class TestPopulation:
+
+    @pytest.fixture(autouse=True)
+    def create_populations(self):
+        """
+        Create a herbivore and a carnivore population
+        """
+        self.herbs = Population(Herbivore)
+        self.carns = Population(Carnivore)
+        self.herbs.place_animals([(5, 20) for _ in range(30)])
+        self.carns.place_animals([(5, 40) for _ in range(20)])
+        self.stream = RandomStream()
+
+    def test_place_animals(self):
+        """
+        To test if animals are placed with given or default values, and that invalid values
+        raise ValueError
+        """
+        assert len(self.herbs) == 30
+        self.herbs.place_animals([(None, None)])
+        assert len(self.herbs) == 31
+        assert self.herbs.age[-1] == 0
+        with pytest.raises(ValueError):
+            self.herbs.place_animals([('old', 20)])
+
+    def test_fitness_same_as_animal(self):
+        """
+        To test that the fitness of the population is the same as for Animal objects,
+        also when the weight is zero
+        """
+        self.herbs.place_animals([(3, 0), (60, 35.5)])
+        for age, weight, fitness in zip(self.herbs.age, self.herbs.weight, self.herbs.fitness):
+            assert fitness == pytest.approx(Herbivore(int(age), float(weight)).calculate_fitness())
+
+    def test_grow_older(self):
+        """
+        To test if the animals grow one year older, lose weight and can migrate again
+        """
+        self.herbs.has_migrated[:] = True
+        self.herbs.grow_older()
+        assert np.all(self.herbs.age == 6)
+        assert np.all(self.herbs.weight < 20)
+        assert not self.herbs.has_migrated.any()
+
+    def test_die(self, mocker):
+        """
+        To test if the random number is low enough all animals die
+        """
+        mocker.patch('biosim.randomstream.RandomStream._draw', side_effect=np.zeros)
+        self.herbs.die(self.stream)
+        assert len(self.herbs) == 0
+
+    def test_procreate(self, mocker):
+        """
+        To test that a single animal can't procreate, and that newborns are added and the
+        mothers lose weight
+        """
+        single = Population(Herbivore)
+        single.place_animals([(5, 50)])
+        single.procreate(self.stream)
+        assert len(single) == 1
+
+        heavy = Population(Herbivore)
+        heavy.place_animals([(5, 50) for _ in range(30)])
+        mocker.patch('biosim.randomstream.RandomStream._draw', side_effect=np.zeros)
+        heavy.procreate(self.stream)
+        assert len(heavy) > 30
+        assert np.all(heavy.weight[:30] < 50)
+        assert np.all(heavy.age[30:] == 0)
+
+    def test_graze(self):
+        """
+        To test that the herbivores eat all the fodder when there is not enough for everyone
+        """
+        fodder_left = self.herbs.graze(95., self.stream)
+        assert fodder_left == 0
+        assert np.sum(self.herbs.weight > 20) == 10
+
+    def test_hunt(self, mocker):
+        """
+        To test that carnivores eat herbivores, and the eaten herbivores are removed
+        """
+        mocker.patch('biosim.randomstream.RandomStream._draw', side_effect=np.zeros)
+        self.carns.hunt(self.herbs, self.stream)
+        assert len(self.herbs) < 30
+        assert np.all(self.carns.weight >= 40)
+
+    def test_migration_directions(self, mocker):
+        """
+        To test that migrating animals get a direction and can migrate only once a year
+        """
+        mocker.patch('biosim.randomstream.RandomStream._draw', side_effect=np.zeros)
+        directions = self.herbs.migration_directions(self.stream)
+        assert np.all((directions >= 0) & (directions < 4))
+        assert np.all(self.herbs.migration_directions(self.stream) == -1)
+
+    def test_split(self):
+        """
+        To test that split moves the animals to one population per destination, and keeps
+        the animals with destination -1
+        """
+        destinations = np.arange(30) % 4 - 1
+        weight = self.herbs.weight.copy()
+        moved = self.herbs.split(destinations, 3)
+        assert [len(group) for group in moved] == [8, 7, 7]
+        assert len(self.herbs) == 8
+        assert np.array_equal(moved[1].weight, weight[destinations == 1])
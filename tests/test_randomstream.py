@@ -0,0 +1,106 @@
+import pytest
+import numpy as np
+from biosim.randomstream import RandomStream, phase_streams
+
+SEED = 12345678  # random seed for tests
+
+
+class TestRandomStream:
+
+    def draw_mixed(self, stream):
+        """
+        Draws numbers from the stream in the same way as a cell phase does
+        """
+        stream.prepare(10)
+        numbers = [stream.random() for _ in range(3)]
+        numbers.extend(stream.random_array(40))
+        numbers.append(stream.random())
+        return np.array(numbers)
+
+    def test_exact_mode_same_as_generator(self):
+        """
+        To test that exact mode gives the same numbers as drawing one at a time from the
+        generator of the stream
+        """
+        stream = RandomStream('exact', seed=SEED)
+        expected = np.array([stream._generator_of_cell().random() for _ in range(44)])
+        stream.select(0, 1)
+        stream.select(0, 0)
+        assert np.all(self.draw_mixed(stream) == expected)
+
+    @pytest.mark.parametrize('min_block', [1, 7, 64, 1000])
+    def test_block_mode_independent_of_block_size(self, min_block):
+        """
+        To test that in block mode the numbers are served in the order they were drawn,
+        so the result does not depend on the block size
+        """
+        expected = self.draw_mixed(RandomStream('exact', seed=SEED))
+        assert np.all(self.draw_mixed(RandomStream('block', min_block, SEED)) == expected)
+
+    def test_block_mode_draws_blocks(self, mocker):
+        """
+        To test that prepare draws one block for the whole population
+        """
+        draw = mocker.patch('biosim.randomstream.RandomStream._draw', side_effect=np.zeros)
+        stream = RandomStream()
+        stream.prepare(500)
+        for _ in range(500):
+            stream.random()
+        assert draw.call_count == 1
+
+    def test_directions(self):
+        """
+        To test that directions are one of the four neighbouring cells, in both modes
+        """
+        for mode in RandomStream.modes:
+            stream = RandomStream(mode)
+            directions = stream.directions(1000)
+            assert set(directions) == {0, 1, 2, 3}
+            assert stream.direction() in [0, 1, 2, 3]
+
+    def test_select(self):
+        """
+        To test that the numbers of a cell in a year only depend on the seed, and not on the
+        cells selected before
+        """
+        stream = RandomStream(seed=SEED)
+        stream.select(3, 10)
+        expected = stream.random_array(5)
+        stream.select(3, 11)
+        assert not np.any(stream.random_array(5) == expected)
+        other = RandomStream(seed=SEED)
+        other.select(3, 10)
+        assert np.all(other.random_array(5) == expected)
+        other = RandomStream(seed=SEED + 1)
+        other.select(3, 10)
+        assert not np.any(other.random_array(5) == expected)
+
+    @pytest.mark.parametrize('mode', RandomStream.modes)
+    def test_select_again(self, mode):
+        """
+        To test that a cell selected again in the same year continues where it was left,
+        and gets the same numbers as without the other cell in between
+        """
+        stream = RandomStream(mode, seed=SEED)
+        stream.select(3, 10)
+        expected = np.concatenate((stream.random_array(5), stream.normal(0, 1, 3),
+                                   stream.permutation(4)))
+        stream = RandomStream(mode, seed=SEED)
+        stream.select(3, 10)
+        first = stream.random_array(5)
+        stream.select(3, 11)
+        stream.random_array(7)
+        stream.select(3, 10)
+        numbers = np.concatenate((first, stream.normal(0, 1, 3), stream.permutation(4)))
+        assert np.all(numbers == expected)
+        stream.select(4, 10)
+        assert not np.any(stream.random_array(5) == first)
+
+    def test_phase_streams(self):
+        """
+        To test that every phase gets its own stream, and that unknown modes raise ValueError
+        """
+        streams = phase_streams()
+        assert len(set(map(id, streams.values()))) == len(streams)
+        with pytest.raises(ValueError):
+            phase_streams('fast')
@@ -0,0 +1,161 @@
+import pytest
+import numpy as np
+from biosim.island import Island
+from biosim.recorder import Recorder, DensityHistory, read_record, read_header, \
+    read_density_history
+from biosim.simulation import BioSim
+
+SEED = 12345678  # random seed for tests
+
+
+class TestRecorder:
+
+    @pytest.fixture(autouse=True)
+    def create_island(self, tmp_path):
+        """
+        Create an island with herbivores and carnivores, and a path for the recording
+        """
+        self.island = Island('WWWWW\nWLLLW\nWLHLW\nWWWWW', seed=SEED)
+        self.island.place_animals([{'loc': (2, 2),
+                                    'pop': ([{'species': 'Herbivore', 'age': 5, 'weight': 20}
+                                             for _ in range(50)] +
+                                            [{'species': 'Carnivore', 'age': 5, 'weight': 20}
+                                             for _ in range(5)])}])
+        self.path = str(tmp_path / 'recording')
+        self.species = ['Herbivore', 'Carnivore']
+
+    def run(self, recorder, years):
+        """
+        Records the island for some years, and returns the totals of every year
+        """
+        totals = []
+        for _ in range(years):
+            self.island.annual_cycle()
+            recorder.record(self.island._year, self.island)
+            totals.append([self.island.total_num_animals_per_species(species)
+                           for species in self.species])
+        return totals
+
+    def test_record_and_read(self):
+        """
+        To test that the recorded rows are read back with the right shapes and values, and
+        that rows are only written when flush_years rows are collected or the recorder closes
+        """
+        recorder = Recorder(self.path, self.species, self.island.cells_dims, summaries=True,
+                            flush_years=10)
+        totals = self.run(recorder, 15)
+        assert len(read_record(self.path)['year']) == 10
+        recorder.close()
+
+        columns = read_record(self.path)
+        assert columns['year'].tolist() == list(range(1, 16))
+        assert columns['totals'].tolist() == totals
+        assert columns['density'].shape == (15, 2, 4, 5)
+        assert np.array_equal(columns['density'].sum(axis=(2, 3)), columns['totals'])
+        assert np.all(columns['fitness_mean'][columns['totals'] > 0] > 0)
+        assert read_header(self.path)['species'] == self.species
+
+    def test_append(self):
+        """
+        To test that a recording opened with mode 'a' continues after the rows written, and
+        that appending with other columns raises ValueError
+        """
+        with Recorder(self.path, self.species, self.island.cells_dims) as recorder:
+            self.run(recorder, 5)
+        with Recorder(self.path, self.species, self.island.cells_dims, mode='a') as recorder:
+            self.run(recorder, 5)
+        assert read_record(self.path)['year'].tolist() == list(range(1, 11))
+        with pytest.raises(ValueError):
+            Recorder(self.path, self.species, self.island.cells_dims, summaries=True, mode='a')
+
+    def test_simulation_recording(self):
+        """
+        To test that BioSim records every simulated year while recording
+        """
+        sim = BioSim('WWWW\nWLLW\nWWWW', SEED,
+                     [{'loc': (2, 2), 'pop': [{'species': 'Herbivore', 'age': 5, 'weight': 20}
+                                              for _ in range(20)]}])
+        sim.start_recording(self.path)
+        sim.simulate(5, vis_years=None)
+        sim.stop_recording()
+        sim.simulate(2, vis_years=None)
+        columns = read_record(self.path)
+        assert columns['year'].tolist() == [1, 2, 3, 4, 5]
+        assert columns['density'].shape == (5, 2, 3, 4)
+
+    def test_recording_after_resume(self, tmp_path):
+        """
+        To test that a simulation resumed from a checkpoint drops the rows recorded after
+        the checkpoint, giving the same recording as a run without interruption
+        """
+        checkpoint = str(tmp_path / 'checkpoint.npz')
+        ini_pop = [{'loc': (2, 2), 'pop': [{'species': 'Herbivore', 'age': 5, 'weight': 20}
+                                           for _ in range(20)]}]
+        sim = BioSim('WWWW\nWLLW\nWWWW', SEED, ini_pop)
+        sim.start_recording(self.path, summaries=True, flush_years=3)
+        sim.start_checkpoints(checkpoint, 4)
+        sim.simulate(10, vis_years=None)
+        sim.stop_recording()
+        expected = read_record(self.path)
+
+        resumed = BioSim.from_checkpoint(checkpoint)
+        assert resumed.year == 8
+        resumed.start_recording(self.path, summaries=True, flush_years=3, mode='a')
+        assert read_record(self.path)['year'].tolist() == list(range(1, 9))
+        resumed.simulate(2, vis_years=None)
+        resumed.stop_recording()
+        columns = read_record(self.path)
+        assert columns['year'].tolist() == list(range(1, 11))
+        for name, values in expected.items():
+            assert np.array_equal(columns[name], values, equal_nan=True)
+
+    def test_density_history(self):
+        """
+        To test that the density history grows across simulations, is read back lazily with
+        the grids of every year, and that a gap in the years raises ValueError
+        """
+        history = DensityHistory(self.path, self.species, self.island.cells_dims)
+        grids = []
+        for num_years in [3, 4]:
+            history.reserve(num_years)
+            for _ in range(num_years):
+                self.island.annual_cycle()
+                history.record(self.island._year, self.island)
+                grids.append(np.stack([self.island.animal_count_grid(species)
+                                       for species in self.species], axis=-1))
+        history.close()
+
+        years, history_grids = read_density_history(self.path)
+        assert isinstance(history_grids, np.memmap)
+        assert years.tolist() == list(range(1, 8))
+        assert history_grids.shape == (7, 4, 5, 2)
+        assert np.array_equal(history_grids[2:5], grids[2:5])
+        with pytest.raises(ValueError):
+            DensityHistory(self.path, self.species, self.island.cells_dims,
+                           mode='a').record(10, self.island)
+
+    def test_density_history_after_resume(self, tmp_path):
+        """
+        To test that a simulation resumed from a checkpoint writes the years after the
+        checkpoint again, giving the same history as a run without interruption
+        """
+        checkpoint = str(tmp_path / 'checkpoint.npz')
+        ini_pop = [{'loc': (2, 2), 'pop': [{'species': 'Herbivore', 'age': 5, 'weight': 20}
+                                           for _ in range(20)]}]
+        sim = BioSim('WWWW\nWLLW\nWWWW', SEED, ini_pop)
+        sim.start_density_history(self.path)
+        sim.start_checkpoints(checkpoint, 4)
+        sim.simulate(6, vis_years=None)
+        sim.simulate(4, vis_years=None)
+        sim.stop_density_history()
+        _, expected = read_density_history(self.path)
+        expected = np.array(expected)
+
+        resumed = BioSim.from_checkpoint(checkpoint)
+        assert resumed.year == 8
+        resumed.start_density_history(self.path, mode='a')
+        resumed.simulate(2, vis_years=None)
+        resumed.stop_density_history()
+        years, grids = read_density_history(self.path)
+        assert years.tolist() == list(range(1, 11))
+        assert np.array_equal(grids, expected)
@@ -0,0 +1,105 @@
+import pytest
+import numpy as np
+import subprocess
+import sys
+from biosim.simulation import BioSim
+from biosim.animal import Herbivore
+
+
+class TestBioSim:
+
+    @pytest.fixture(autouse=True)
+    def create_simulation(self):
+        """
+        Create a simulation with herbivores on a small island
+        """
+        self.sim = BioSim('WWWW\nWLLW\nWWWW', 1,
+                          [{'loc': (2, 2),
+                            'pop': [{'species': 'Herbivore', 'age': 5, 'weight': 20}
+                                    for _ in range(20)]}])
+
+    @pytest.mark.parametrize('vis_years', [None, 0])
+    def test_headless_simulate(self, vis_years):
+        """
+        To test that a headless simulation runs all years without making a figure
+        """
+        self.sim.simulate(5, vis_years=vis_years)
+        assert self.sim.year == 5
+        assert self.sim._fig is None
+
+    def test_headless_without_matplotlib(self):
+        """
+        To test that importing the simulation module and running headless does not import
+        matplotlib or pandas
+        """
+        code = ('import sys\n'
+                'from biosim.simulation import BioSim\n'
+                "BioSim('WWW\\nWLW\\nWWW', 1, []).simulate(3, vis_years=None)\n"
+                "print(sorted({'matplotlib', 'pandas'} & set(sys.modules)))\n")
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True,
+                                text=True, check=True)
+        assert result.stdout.strip() == '[]'
+
+    def test_parameters_reach_cells(self):
+        """
+        To test that animal and landscape parameters are set on the classes, so they apply to
+        the animals and cells already on the island
+        """
+        self.sim.set_animal_parameters('Herbivore', {'F': 5.})
+        self.sim.set_landscape_parameters('L', {'f_max': 100.})
+        cell = self.sim._island.get_cells()[1, 1]
+        cell.set_fodder()
+        assert cell.get_fodder() == 100.
+        assert Herbivore.params['F'] == 5.
+
+    def test_density_grids(self):
+        """
+        To test that the density grids have the shape of the map, follow the simulation and
+        give the same counts as the animal distribution data frame
+        """
+        self.sim.simulate(3, vis_years=None)
+        grids = self.sim.density_grids
+        assert grids['Herbivore'].shape == (3, 4)
+        assert grids['Herbivore'].sum() == self.sim.num_animals_per_species['Herbivore']
+        df = self.sim._animal_distribution
+        for species, grid in grids.items():
+            assert df[species].tolist() == grid.ravel().tolist()
+
+    def test_density_grids_read_only(self):
+        """
+        To test that the density grids can not be written to, and still follow the island
+        """
+        grids = self.sim.density_grids
+        with pytest.raises(ValueError):
+            grids['Herbivore'][1, 1] = 0
+        with pytest.raises(ValueError):
+            self.sim._island.animal_count_grid('Carnivore')[1, 1] = 5
+        self.sim.simulate(2, vis_years=None)
+        assert grids['Herbivore'].sum() == self.sim.num_animals_per_species['Herbivore']
+
+    @pytest.mark.parametrize('backend', ['object', 'columnar'])
+    def test_resume_from_checkpoint(self, tmp_path, backend):
+        """
+        To test that a simulation resumed from a checkpoint continues in the same way as the
+        simulation that saved it
+        """
+        path = str(tmp_path / 'checkpoint.npz')
+        ini_pop = [{'loc': (2, 2),
+                    'pop': ([{'species': 'Herbivore', 'age': 5, 'weight': 20}
+                             for _ in range(50)] +
+                            [{'species': 'Carnivore', 'age': 5, 'weight': 20}
+                             for _ in range(10)])}]
+        sim = BioSim('WWWWW\nWLLHW\nWLDLW\nWWWWW', 1, ini_pop, backend=backend)
+        sim.start_checkpoints(path, 5)
+        sim.simulate(7, vis_years=None)
+        resumed = BioSim.from_checkpoint(path)
+        assert resumed.year == 5
+        resumed.simulate(5, vis_years=None)
+        sim.simulate(3, vis_years=None)
+
+        for species in ['Herbivore', 'Carnivore']:
+            assert np.array_equal(resumed.density_grids[species], sim.density_grids[species])
+            properties = sim._island.animal_properties(species)
+            for name, values in resumed._island.animal_properties(species).items():
+                assert np.array_equal(values, properties[name])
+        assert resumed.num_animals > 0